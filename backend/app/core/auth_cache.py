@@ -0,0 +1,128 @@
+"""
+Two-tier cache for authenticated user lookups.
+
+Redis is used as the primary tier when REDIS_URL is configured; an
+in-process LRU keeps the hot path off the network (and covers deployments
+without Redis).
+"""
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+import orjson
+
+from .config import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional
+    aioredis = None
+
+KEY_PREFIX = "auth:user:"
+LOCAL_MAX_ENTRIES = 10_000
+
+
+@dataclass
+class CachedAuthContext:
+    """Snapshot of the user columns needed by authenticated endpoints."""
+    id: int
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    role: str
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_user(cls, user: Any) -> "CachedAuthContext":
+        role = getattr(user.role, "value", user.role)
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            role=role,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+    def to_bytes(self) -> bytes:
+        return orjson.dumps(asdict(self))
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CachedAuthContext":
+        data = orjson.loads(raw)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        data["updated_at"] = datetime.fromisoformat(data["updated_at"])
+        return cls(**data)
+
+
+class AuthCache:
+    """Cache of CachedAuthContext entries keyed by user id."""
+
+    def __init__(self, redis_url: Optional[str] = None, default_ttl: int = 60):
+        self.default_ttl = default_ttl
+        self._local: "OrderedDict[str, Tuple[float, CachedAuthContext]]" = OrderedDict()
+        self._redis = aioredis.from_url(redis_url) if (redis_url and aioredis) else None
+
+    def _get_local(self, key: str) -> Optional[CachedAuthContext]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, ctx = entry
+        if expires_at < time.monotonic():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return ctx
+
+    def _set_local(self, key: str, ctx: CachedAuthContext, ttl: int) -> None:
+        self._local[key] = (time.monotonic() + ttl, ctx)
+        self._local.move_to_end(key)
+        while len(self._local) > LOCAL_MAX_ENTRIES:
+            self._local.popitem(last=False)
+
+    async def get(self, user_id: Any) -> Optional[CachedAuthContext]:
+        key = str(user_id)
+        ctx = self._get_local(key)
+        if ctx is not None or self._redis is None:
+            return ctx
+
+        try:
+            raw = await self._redis.get(KEY_PREFIX + key)
+        except Exception:
+            return None
+        if raw is None:
+            return None
+
+        ctx = CachedAuthContext.from_bytes(raw)
+        self._set_local(key, ctx, self.default_ttl)
+        return ctx
+
+    async def set(self, user_id: Any, ctx: CachedAuthContext, ttl: Optional[int] = None) -> None:
+        key = str(user_id)
+        ttl = ttl or self.default_ttl
+        self._set_local(key, ctx, ttl)
+        if self._redis is not None:
+            try:
+                await self._redis.set(KEY_PREFIX + key, ctx.to_bytes(), ex=ttl)
+            except Exception:
+                pass
+
+    def invalidate_local(self, user_id: Any) -> None:
+        """Drop a user's entry from the in-process tier only."""
+        self._local.pop(str(user_id), None)
+
+    async def invalidate(self, user_id: Any) -> None:
+        """Drop a user's entry from both tiers; call after password or account changes."""
+        self.invalidate_local(user_id)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(KEY_PREFIX + str(user_id))
+            except Exception:
+                pass
+
+
+auth_cache = AuthCache(settings.REDIS_URL, settings.AUTH_CACHE_TTL_SECONDS)
@@ -22,9 +22,18 @@ class Settings(BaseSettings):
     # Security
     ALGORITHM: str = "HS256"
     
+    # Cache
+    REDIS_URL: Optional[str] = None
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    
     # File Storage
     UPLOAD_DIR: str = str(Path(__file__).parent.parent.parent / "uploads")
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    ALLOWED_EXTENSIONS: List[str] = [".sol"]
+    
+    # Analysis
+    # A contract left ANALYZING longer than this (e.g. its worker died) can be claimed again
+    ANALYSIS_CLAIM_TIMEOUT_SECONDS: int = 30 * 60
     
     class Config:
         case_sensitive = True
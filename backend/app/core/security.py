@@ -1,18 +1,43 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.user import User
 from ..db.session import get_db
 from .config import settings
+from .auth_cache import CachedAuthContext, auth_cache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Redis invalidations in flight; referenced so they aren't garbage collected
+_pending_invalidations: Set[asyncio.Task] = set()
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target) -> None:
+    """Drop a user's cached auth context when the row is changed or deleted.
+
+    Runs on every ORM flush that touches a user, so deactivation, deletion and
+    password changes take effect on the next request instead of after the
+    cache TTL. Bulk UPDATE/DELETE statements bypass this and must call
+    auth_cache.invalidate themselves.
+    """
+    auth_cache.invalidate_local(target.id)
+    try:
+        task = asyncio.get_running_loop().create_task(auth_cache.invalidate(target.id))
+    except RuntimeError:
+        # No event loop (e.g. a maintenance script): only this process's tier is cleared
+        return
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -27,8 +52,8 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
-    """Get the current authenticated user."""
+) -> CachedAuthContext:
+    """Get the current authenticated user, served from the auth cache when possible."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -39,22 +64,27 @@ async def get_current_user(
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        # Missing or non-numeric subjects are invalid credentials, not server errors
         raise credentials_exception
     
+    cached = await auth_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
     # Get user from database
     user = await db.get(User, user_id)
     if user is None:
         raise credentials_exception
-        
-    return user
+    
+    ctx = CachedAuthContext.from_user(user)
+    await auth_cache.set(user_id, ctx)
+    return ctx
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: CachedAuthContext = Depends(get_current_user),
+) -> CachedAuthContext:
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
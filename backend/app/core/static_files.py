@@ -0,0 +1,63 @@
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.types import Scope
+from starlette.responses import Response
+
+# Assets that are safe to cache for a year; their names change when their content does
+CACHEABLE_EXTENSIONS = (".js", ".css", ".ico", ".png", ".svg", ".woff", ".woff2")
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Files up to this size are held in memory after preload()
+MAX_PRELOAD_SIZE = 256 * 1024
+
+
+class CachingStaticFiles(StaticFiles):
+    """StaticFiles that marks static assets as long-lived in browser caches.
+
+    Small files can be preloaded into memory so requests for them skip the
+    stat/open and ETag computation done by StaticFiles.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # {relative path: (body, media type, etag)}
+        self._memory: Dict[str, Tuple[bytes, str, str]] = {}
+
+    def preload(self, max_size: int = MAX_PRELOAD_SIZE) -> None:
+        """Read every file under the directory no larger than max_size into memory."""
+        if self.directory is None:
+            return
+        root = Path(self.directory)
+        for file_path in root.rglob("*"):
+            if not file_path.is_file() or file_path.stat().st_size > max_size:
+                continue
+            body = file_path.read_bytes()
+            media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            key = os.path.normpath(str(file_path.relative_to(root)))
+            self._memory[key] = (body, media_type, etag)
+
+    def _cache_headers(self, path: str) -> Dict[str, str]:
+        if path.lower().endswith(CACHEABLE_EXTENSIONS):
+            return {"Cache-Control": CACHE_CONTROL}
+        return {}
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        cached = self._memory.get(path)
+        if cached is not None and scope["method"] in ("GET", "HEAD"):
+            body, media_type, etag = cached
+            headers = {"ETag": etag, **self._cache_headers(path)}
+            if Headers(scope=scope).get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            return Response(body, media_type=media_type, headers=headers)
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers.update(self._cache_headers(path))
+        return response
@@ -1,5 +1,6 @@
 import os
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -8,10 +9,20 @@ from typing import AsyncGenerator
 from ..core.config import settings
 
 # Create async engine
+# AsyncAdaptedQueuePool is pinned explicitly: a plain QueuePool hangs under
+# load with asyncpg. Connections are recycled after 30 minutes to stay ahead
+# of server-side idle timeouts, which makes the per-checkout pre-ping round
+# trip unnecessary.
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,
-    future=True
+    echo=False,
+    future=True,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=10,
+    pool_recycle=1800,
+    pool_pre_ping=False,
+    query_cache_size=1200
 )
 
 # Create async session factory
@@ -35,13 +46,9 @@ async def init_db():
         await conn.run_sync(Base.metadata.create_all)
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency that provides a database session."""
+    """Dependency that provides a database session.
+
+    No implicit commit is issued; endpoints that write call ``db.commit()``.
+    """
     async with AsyncSessionLocal() as session:
-        try:
-            yield session
-            await session.commit()
-        except Exception as e:
-            await session.rollback()
-            raise e
-        finally:
-            await session.close()
+        yield session
@@ -1,19 +1,24 @@
 import os
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 
+from . import __version__
 from .core.config import settings
+from .core.static_files import CachingStaticFiles
 from .routers import auth, contracts
+from .routers.contracts import start_analysis_pool, shutdown_analysis_pool
 from .db.session import init_db
+from websocket.router import include_websocket_routes
 
 app = FastAPI(
     title="Contract Evaluation API",
     description="API for analyzing and evaluating smart contracts",
-    version="1.0.0",
+    version=__version__,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware configuration
@@ -27,16 +32,25 @@ app.add_middleware(
 
 # Mount static files
 os.makedirs("static", exist_ok=True)
-app.mount("/static", StaticFiles(directory="static"), name="static")
+static_files = CachingStaticFiles(directory="static")
+app.mount("/static", static_files, name="static")
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(contracts.router, prefix="/api/contracts", tags=["Contracts"])
+include_websocket_routes(app)
 
 @app.on_event("startup")
 async def startup_event():
     # Initialize database
     await init_db()
+    start_analysis_pool()
+    # Serve small static assets from memory
+    static_files.preload()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_analysis_pool()
 
 @app.get("/api/health")
 async def health_check():
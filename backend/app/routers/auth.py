@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from typing import Any
 
+from sqlalchemy import bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -15,18 +16,25 @@ from ..core.security import (
     verify_password,
     get_current_user,
 )
+from ..core.auth_cache import CachedAuthContext
 from ..core.config import settings
 
 router = APIRouter()
 
+# Columns-only lookups, built once so SQLAlchemy's compiled cache is reused
+USER_AUTH_STMT = select(
+    User.id, User.hashed_password, User.is_active, User.role
+).where(User.email == bindparam("email"))
+USER_EXISTS_STMT = select(User.id).where(User.email == bindparam("email"))
+
 @router.post("/register", response_model=Token)
 async def register(
     user_in: UserCreate, db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Register a new user."""
     # Check if user already exists
-    result = await db.execute(select(User).filter(User.email == user_in.email))
-    if result.scalars().first() is not None:
+    result = await db.execute(USER_EXISTS_STMT, {"email": user_in.email})
+    if result.first() is not None:
         raise HTTPException(
             status_code=400,
             detail="Email already registered",
@@ -60,8 +68,8 @@ async def login(
 ) -> Any:
     """OAuth2 compatible token login."""
     # Get user from database
-    result = await db.execute(select(User).filter(User.email == form_data.username))
-    user = result.scalars().first()
+    result = await db.execute(USER_AUTH_STMT, {"email": form_data.username})
+    user = result.first()
     
     if user is None or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
@@ -83,7 +91,7 @@ async def login(
 
 @router.get("/me", response_model=UserInDB)
 async def read_users_me(
-    current_user: User = Depends(get_current_user),
+    current_user: CachedAuthContext = Depends(get_current_user),
 ) -> Any:
     """Get current user."""
     return current_user
@@ -1,61 +1,129 @@
+import asyncio
+import logging
 import os
-import shutil
-from datetime import datetime
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
-from fastapi.responses import FileResponse
+import aiofiles
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Request, UploadFile, HTTPException, status
+from sqlalchemy import func, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 
-from ..db.session import get_db
-from ..models.contract import Contract, Analysis, ContractStatus, SeverityLevel
-from ..models.user import User
-from ..schemas.contract import ContractCreate, ContractInDB, AnalysisCreate, AnalysisInDB
+from core.analysis import fused_scan
+from websocket import manager
+from websocket.events import analysis_complete_event, analysis_error_event
+
+from ..db.session import AsyncSessionLocal, get_db
+from ..models.contract import Contract, Analysis, ContractStatus
+from ..schemas.contract import ContractInDB, AnalysisInDB
+from ..core.auth_cache import CachedAuthContext
 from ..core.security import get_current_user
 from ..core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-# Ensure upload directory exists
-UPLOAD_DIR = Path(settings.UPLOAD_DIR)
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Upload directory (created by core.config on import)
+_UPLOAD_DIR_STR = settings.UPLOAD_DIR
+_ALLOWED_EXTENSIONS = tuple(ext.lower() for ext in settings.ALLOWED_EXTENSIONS)
+# Content types that can never be Solidity source
+_REJECTED_CONTENT_TYPES = ("image/", "audio/", "video/")
+
+# Uploads are streamed to disk in 1 MiB chunks
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Allowance for multipart boundaries and part headers in Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Worker processes for CPU-bound detector scans, created on app startup
+_ANALYSIS_POOL: Optional[ProcessPoolExecutor] = None
+
+def start_analysis_pool() -> None:
+    """Create the process pool used to run detector scans."""
+    global _ANALYSIS_POOL
+    if _ANALYSIS_POOL is None:
+        _ANALYSIS_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+def shutdown_analysis_pool() -> None:
+    """Shut down the detector process pool."""
+    global _ANALYSIS_POOL
+    if _ANALYSIS_POOL is not None:
+        _ANALYSIS_POOL.shutdown(wait=False, cancel_futures=True)
+        _ANALYSIS_POOL = None
+
+def _discard(file_path: str) -> None:
+    """Remove a partially written upload, ignoring a missing file."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
 
 @router.post("/upload/", response_model=ContractInDB)
 async def upload_contract(
+    request: Request,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: CachedAuthContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """Upload a smart contract for analysis."""
+    # Reject oversized requests before writing anything
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+        )
+    
     # Validate file type
-    if not file.filename or not file.filename.endswith('.sol'):
+    if (
+        not (file.filename or "").lower().endswith(_ALLOWED_EXTENSIONS)
+        or (file.content_type or "").startswith(_REJECTED_CONTENT_TYPES)
+    ):
         raise HTTPException(
             status_code=400,
-            detail="Only .sol files are supported"
+            detail=f"Only {', '.join(_ALLOWED_EXTENSIONS)} files are supported"
         )
     
     # Save file
-    timestamp = int(datetime.utcnow().timestamp())
-    filename = f"{current_user.id}_{timestamp}_{file.filename}"
-    file_path = UPLOAD_DIR / filename
+    filename = f"{current_user.id}_{time.time_ns()}_{uuid.uuid4().hex[:8]}_{file.filename}"
+    file_path = os.path.join(_UPLOAD_DIR_STR, filename)
     
+    size = 0
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    break
+                await buffer.write(chunk)
     except Exception as e:
+        _discard(file_path)
         raise HTTPException(
             status_code=500,
             detail=f"Error saving file: {str(e)}"
         )
     
+    if size > settings.MAX_FILE_SIZE:
+        _discard(file_path)
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+        )
+    
     # Create contract record
     contract = Contract(
         name=file.filename,
-        file_path=str(file_path),
+        file_path=file_path,
         original_filename=file.filename,
-        file_size=os.path.getsize(file_path),
+        file_size=size,
         file_type=file.content_type or "application/octet-stream",
         status=ContractStatus.UPLOADED,
         owner_id=current_user.id,
@@ -64,6 +132,9 @@ async def upload_contract(
     db.add(contract)
     await db.commit()
     await db.refresh(contract)
+    # Load the (empty) analyses collection here; lazy loading is not
+    # available once the response is being serialized
+    await db.refresh(contract, attribute_names=["analyses"])
     
     return contract
 
@@ -71,12 +142,13 @@ async def upload_contract(
 async def list_contracts(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    current_user: CachedAuthContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """List all contracts for the current user."""
     result = await db.execute(
         select(Contract)
+        .options(selectinload(Contract.analyses))
         .filter(Contract.owner_id == current_user.id)
         .offset(skip)
         .limit(limit)
@@ -86,12 +158,13 @@ async def list_contracts(
 @router.get("/{contract_id}", response_model=ContractInDB)
 async def get_contract(
     contract_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CachedAuthContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """Get a specific contract by ID."""
     result = await db.execute(
         select(Contract)
+        .options(selectinload(Contract.analyses))
         .filter(Contract.id == contract_id, Contract.owner_id == current_user.id)
     )
     contract = result.scalars().first()
@@ -104,105 +177,185 @@ async def get_contract(
     
     return contract
 
-@router.post("/{contract_id}/analyze", response_model=AnalysisInDB)
+def _summarize(findings: List[dict]) -> dict:
+    """Count findings by severity in a single pass."""
+    counts = Counter(i["severity"] for i in findings)
+    return {
+        "total_issues": len(findings),
+        "high_issues": counts.get("high", 0),
+        "medium_issues": counts.get("medium", 0),
+        "low_issues": counts.get("low", 0)
+    }
+
+async def _release_failed_claim(contract_id: int) -> None:
+    """Mark a contract whose analysis did not finish as FAILED, in a fresh transaction."""
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Contract)
+                .where(Contract.id == contract_id, Contract.status == ContractStatus.ANALYZING)
+                .values(status=ContractStatus.FAILED)
+            )
+            await db.commit()
+    except Exception:
+        # The claim still expires after ANALYSIS_CLAIM_TIMEOUT_SECONDS
+        logger.exception(f"Failed to release analysis claim on contract {contract_id}")
+
+async def run_analysis(analysis_id: int, contract_id: int, file_path: str, user_id: int) -> None:
+    """Run the detectors for a queued analysis and record the results."""
+    started = time.perf_counter()
+    completed = False
+    error: Optional[Exception] = None
+    
+    try:
+        async with AsyncSessionLocal() as db:
+            analysis = await db.get(Analysis, analysis_id)
+            contract = await db.get(Contract, contract_id)
+            if analysis is None or contract is None:
+                raise LookupError(f"Analysis {analysis_id} or contract {contract_id} no longer exists")
+            
+            content = await anyio.to_thread.run_sync(
+                lambda: Path(file_path).read_text(encoding="utf-8", errors="replace")
+            )
+            # Detectors are CPU-bound; run them in a worker process so
+            # concurrent analyses are not serialized by the GIL
+            if _ANALYSIS_POOL is not None:
+                findings = await asyncio.get_running_loop().run_in_executor(
+                    _ANALYSIS_POOL, fused_scan, content
+                )
+            else:
+                findings = await anyio.to_thread.run_sync(fused_scan, content)
+            
+            summary = _summarize(findings)
+            analysis.findings = findings
+            analysis.summary = summary
+            analysis.analysis_time_ms = int((time.perf_counter() - started) * 1000)
+            contract.status = ContractStatus.COMPLETED
+            # Notifications below use plain values, not ORM instances from a closed session
+            contract_name = contract.name
+            await db.commit()
+            completed = True
+    except Exception as e:
+        error = e
+    finally:
+        # Never leave the contract claimed, however the analysis stopped
+        # (including cancellation on shutdown)
+        if not completed:
+            await _release_failed_claim(contract_id)
+    
+    if error is not None:
+        await manager.send_to_user(
+            str(user_id), analysis_error_event(str(analysis_id), f"Analysis failed: {str(error)}")
+        )
+        return
+    
+    await manager.send_to_user(
+        str(user_id),
+        analysis_complete_event(
+            {
+                "analysis_id": str(analysis_id),
+                "contract_name": contract_name,
+                "file_count": 1,
+                "status": "completed"
+            },
+            {
+                "vulnerability_count": summary["total_issues"],
+                "high": summary["high_issues"],
+                "medium": summary["medium_issues"],
+                "low": summary["low_issues"]
+            }
+        )
+    )
+
+@router.post("/{contract_id}/analyze", status_code=status.HTTP_202_ACCEPTED)
 async def analyze_contract(
     contract_id: int,
-    current_user: User = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: CachedAuthContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
-    """Analyze a contract."""
-    # Get contract
+    """Queue a contract for analysis.
+    
+    Returns immediately; results are stored on the analysis record and
+    pushed to the user's WebSocket connections when ready.
+    """
+    # Atomically claim the contract; a concurrent request for the same
+    # contract sees ANALYZING and matches no row. A claim older than the
+    # timeout belongs to an analysis that died and can be taken over
     result = await db.execute(
-        select(Contract)
-        .filter(Contract.id == contract_id, Contract.owner_id == current_user.id)
+        update(Contract)
+        .where(
+            Contract.id == contract_id,
+            Contract.owner_id == current_user.id,
+            or_(
+                Contract.status != ContractStatus.ANALYZING,
+                Contract.updated_at < func.now() - timedelta(seconds=settings.ANALYSIS_CLAIM_TIMEOUT_SECONDS),
+            ),
+        )
+        .values(status=ContractStatus.ANALYZING, updated_at=func.now())
+        .returning(Contract)
     )
-    contract = result.scalars().first()
+    contract = result.scalar_one_or_none()
     
     if not contract:
+        result = await db.execute(
+            select(Contract.id)
+            .filter(Contract.id == contract_id, Contract.owner_id == current_user.id)
+        )
+        if result.first() is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Contract not found"
+            )
         raise HTTPException(
-            status_code=404,
-            detail="Contract not found"
+            status_code=409,
+            detail="Contract is already being analyzed"
         )
     
-    # Update contract status
-    contract.status = ContractStatus.ANALYZING
+    # Create a pending analysis record
+    analysis = Analysis(
+        contract_id=contract.id,
+        user_id=current_user.id,
+        analyzer_version="1.0.0",
+        findings=[],
+        summary={}
+    )
+    db.add(analysis)
     await db.commit()
+    await db.refresh(analysis)
     
-    try:
-        # TODO: Implement actual contract analysis here
-        # This is a placeholder for the analysis logic
-        analysis_result = {
-            "issues": [
-                {
-                    "severity": "high",
-                    "description": "Reentrancy vulnerability detected",
-                    "line": 42,
-                    "pattern": "call.value()()",
-                    "recommendation": "Use Checks-Effects-Interactions pattern"
-                },
-                {
-                    "severity": "medium",
-                    "description": "Unchecked external call",
-                    "line": 128,
-                    "pattern": "address.call()",
-                    "recommendation": "Validate return values of external calls"
-                }
-            ]
-        }
-        
-        # Create analysis record
-        analysis = Analysis(
-            contract_id=contract.id,
-            user_id=current_user.id,
-            analyzer_version="1.0.0",
-            analysis_time_ms=500,  # Example value
-            findings=analysis_result["issues"],
-            summary={
-                "total_issues": len(analysis_result["issues"]),
-                "high_issues": len([i for i in analysis_result["issues"] if i["severity"] == "high"]),
-                "medium_issues": len([i for i in analysis_result["issues"] if i["severity"] == "medium"]),
-                "low_issues": len([i for i in analysis_result["issues"] if i["severity"] == "low"])
-            }
-        )
-        
-        db.add(analysis)
-        contract.status = ContractStatus.COMPLETED
-        await db.commit()
-        await db.refresh(analysis)
-        
-        return analysis
-        
-    except Exception as e:
-        contract.status = ContractStatus.FAILED
-        await db.commit()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Analysis failed: {str(e)}"
-        )
+    background_tasks.add_task(
+        run_analysis, analysis.id, contract.id, contract.file_path, current_user.id
+    )
+    
+    return {"analysis_id": analysis.id, "status": "processing"}
 
 @router.get("/{contract_id}/analyses", response_model=List[AnalysisInDB])
 async def list_analyses(
     contract_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CachedAuthContext = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """List all analyses for a contract."""
-    # Verify contract ownership
-    result = await db.execute(
-        select(Contract)
-        .filter(Contract.id == contract_id, Contract.owner_id == current_user.id)
-    )
-    if not result.scalars().first():
-        raise HTTPException(
-            status_code=404,
-            detail="Contract not found"
-        )
-    
-    # Get analyses
+    # Ownership is enforced by the join
     result = await db.execute(
         select(Analysis)
-        .filter(Analysis.contract_id == contract_id)
+        .join(Contract, Analysis.contract_id == Contract.id)
+        .filter(Contract.id == contract_id, Contract.owner_id == current_user.id)
         .order_by(Analysis.created_at.desc())
     )
+    analyses = result.scalars().all()
     
-    return result.scalars().all()
+    # An empty result needs a second look to tell "no analyses" from "no contract"
+    if not analyses:
+        result = await db.execute(
+            select(Contract.id)
+            .filter(Contract.id == contract_id, Contract.owner_id == current_user.id)
+        )
+        if result.first() is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Contract not found"
+            )
+    
+    return analyses
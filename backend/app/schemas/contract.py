@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 from enum import Enum
@@ -39,8 +39,7 @@ class AnalysisInDB(AnalysisBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ContractBase(BaseModel):
     name: str
@@ -61,8 +60,7 @@ class ContractInDB(ContractBase):
     updated_at: datetime
     analyses: List[AnalysisInDB] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AnalysisWithContract(AnalysisInDB):
     contract: ContractInDB
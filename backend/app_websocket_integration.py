@@ -1,21 +1,17 @@
 """
 This module demonstrates how to integrate WebSockets into the main FastAPI application.
-Add these changes to your main app.py file.
+The WebSocket routes themselves are registered by app.main via include_websocket_routes;
+the example endpoint below lives on a router so it does not create a second app.
 """
 
-# Import the WebSocket router and necessary dependencies
-from fastapi import FastAPI, Depends
-from websocket.router import include_websocket_routes
+# Import the WebSocket manager and necessary dependencies
+from fastapi import APIRouter
 from websocket import manager, EventType
 from websocket.events import create_event, analysis_progress_event, analysis_complete_event
 import asyncio
 
-# Sample code to integrate WebSockets with your existing FastAPI app
-# Replace this with your actual app initialization
-app = FastAPI(title="Smart Contract Analyzer API")
-
-# Include the WebSocket routes
-include_websocket_routes(app)
+# Example router; include it with app.include_router(router) to try it out
+router = APIRouter()
 
 # Example of how to send updates from your analysis service
 async def send_analysis_updates(analysis_id: str, user_id: str = None):
@@ -103,7 +99,7 @@ async def send_analysis_updates(analysis_id: str, user_id: str = None):
 
 
 # Example of how to integrate with your analysis endpoint
-@app.post("/contracts/analyze")
+@router.post("/contracts/analyze")
 async def analyze_contract(contract_data: dict, user_id: str = None):
     """
     Example endpoint for contract analysis that uses WebSockets for progress updates
@@ -127,9 +123,9 @@ async def analyze_contract(contract_data: dict, user_id: str = None):
 """
 Usage instructions:
 
-1. Add the WebSocket integration to your main FastAPI app:
-   - Import the WebSocket router and manager
-   - Call include_websocket_routes(app)
+1. The WebSocket integration is already part of the main FastAPI app:
+   - app.main calls include_websocket_routes(app)
+   - Import the manager to send events
 
 2. To send real-time updates from your analysis service:
    - Import the manager and event helper functions
@@ -10,7 +10,8 @@ from .detectors import (
     ReentrancyDetector,
     IntegerOverflowDetector,
     AccessControlDetector,
-    get_all_detectors
+    get_all_detectors,
+    fused_scan
 )
 
 __all__ = [
@@ -18,5 +19,6 @@ __all__ = [
     'ReentrancyDetector',
     'IntegerOverflowDetector',
     'AccessControlDetector',
-    'get_all_detectors'
+    'get_all_detectors',
+    'fused_scan'
 ]
@@ -1,6 +1,63 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import re
-from pathlib import Path
+
+import numpy as np
+
+
+def _line_starts(contract_content: str) -> np.ndarray:
+    """Return the offset at which each line of the content starts"""
+    if contract_content.isascii():
+        buf = np.frombuffer(contract_content.encode('ascii'), dtype=np.uint8)
+    else:
+        # UTF-32 keeps one element per character so offsets match str indices
+        buf = np.frombuffer(contract_content.encode('utf-32-le'), dtype=np.uint32)
+    return np.concatenate(([0], np.flatnonzero(buf == 10) + 1))
+
+
+def _match_lines(matches: List[re.Match], line_starts: np.ndarray) -> List[int]:
+    """Return the 1-based line number of each match"""
+    offsets = np.fromiter((m.start() for m in matches), dtype=np.int64, count=len(matches))
+    return np.searchsorted(line_starts, offsets, side='right').tolist()
+
+
+def _line_end(contract_content: str, line_starts: np.ndarray, line: int) -> int:
+    """Return the offset just past the last character of a 1-based line"""
+    return line_starts[line] - 1 if line < len(line_starts) else len(contract_content)
+
+
+# Simple pattern matching for external calls followed by state changes
+# This is a simplified example - a real implementation would use AST analysis.
+# Whitespace classes exclude '\n' so matches stay on a single line.
+EXTERNAL_CALL_PATTERNS = [
+    r'\.(?:call|send|transfer)[^\S\n]*\(',
+    r'\b(?:msg\.sender|tx\.origin)\.call\b',
+]
+
+# Arithmetic operators: '+', '-', '*', '/', '**', '%', '<<', '>>', '|', '&', '^'
+ARITHMETIC_PATTERN = r'\*\*|<<|>>|[+\-*/%|&^]'
+
+ACCESS_CONTROL_KEYWORDS = ['onlyOwner', 'onlyRole', 'require(msg.sender == owner)']
+
+
+def _reentrancy_finding(line: int) -> Dict[str, Any]:
+    return {
+        'line': line,
+        'severity': 'high',
+        'pattern': 'external_call',
+        'description': 'Potential external call that could lead to reentrancy',
+        'recommendation': 'Use the Checks-Effects-Interactions pattern and consider using ReentrancyGuard'
+    }
+
+
+def _overflow_finding(line: int) -> Dict[str, Any]:
+    return {
+        'line': line,
+        'severity': 'high',
+        'pattern': 'arithmetic_operation',
+        'description': 'Potential integer overflow/underflow in arithmetic operation',
+        'recommendation': 'Use SafeMath or Solidity 0.8+ with built-in overflow checks'
+    }
+
 
 class VulnerabilityDetector:
     """Base class for vulnerability detectors"""
@@ -9,8 +66,16 @@ class VulnerabilityDetector:
         self.name = "Base Detector"
         self.description = "Base class for all vulnerability detectors"
     
-    def detect(self, contract_path: str, contract_content: str) -> List[Dict[str, Any]]:
-        """Detect vulnerabilities in the given contract"""
+    def detect(
+        self,
+        contract_path: str,
+        contract_content: str,
+        line_starts: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
+        """Detect vulnerabilities in the given contract
+
+        line_starts may be passed in when several detectors scan the same content.
+        """
         raise NotImplementedError("Subclasses must implement this method")
 
 
@@ -21,32 +86,26 @@ class ReentrancyDetector(VulnerabilityDetector):
         super().__init__()
         self.name = "Reentrancy Detector"
         self.description = "Detects reentrancy vulnerabilities in Solidity contracts"
+        self._ext_re = re.compile("|".join(f"(?:{p})" for p in EXTERNAL_CALL_PATTERNS))
     
-    def detect(self, contract_path: str, contract_content: str) -> List[Dict[str, Any]]:
+    def detect(
+        self,
+        contract_path: str,
+        contract_content: str,
+        line_starts: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
         """Detect reentrancy vulnerabilities"""
         findings = []
+        if line_starts is None:
+            line_starts = _line_starts(contract_content)
+        matches = list(self._ext_re.finditer(contract_content))
+        last_line = 0
         
-        # Simple pattern matching for external calls followed by state changes
-        # This is a simplified example - a real implementation would use AST analysis
-        external_call_patterns = [
-            r'\.(call|send|transfer)\s*\(',
-            r'\b(?:msg\.sender|tx\.origin)\.call\b',
-        ]
-        
-        state_change_patterns = [
-            r'\b(?:balances|mapping|array)\[[^\]]+\]\s*[+-]?=',
-            r'\b(?:balances|mapping|array)\[[^\]]+\]\s*=\s*',
-        ]
-        
-        for i, line in enumerate(contract_content.split('\n'), 1):
-            if any(re.search(pattern, line) for pattern in external_call_patterns):
-                findings.append({
-                    'line': i,
-                    'severity': 'high',
-                    'pattern': 'external_call',
-                    'description': 'Potential external call that could lead to reentrancy',
-                    'recommendation': 'Use the Checks-Effects-Interactions pattern and consider using ReentrancyGuard'
-                })
+        for i in _match_lines(matches, line_starts):
+            if i == last_line:
+                continue
+            last_line = i
+            findings.append(_reentrancy_finding(i))
         
         return findings
 
@@ -58,26 +117,36 @@ class IntegerOverflowDetector(VulnerabilityDetector):
         super().__init__()
         self.name = "Integer Overflow Detector"
         self.description = "Detects potential integer overflows/underflows in arithmetic operations"
+        self._arith_re = re.compile(ARITHMETIC_PATTERN)
     
-    def detect(self, contract_path: str, contract_content: str) -> List[Dict[str, Any]]:
+    def detect(
+        self,
+        contract_path: str,
+        contract_content: str,
+        line_starts: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
         findings = []
         
+        # Skip everything if SafeMath is being used
+        if 'using SafeMath' in contract_content:
+            return findings
+        
         # Look for arithmetic operations without SafeMath or unchecked blocks
-        arithmetic_ops = ['+', '-', '*', '/', '**', '%', '<<', '>>', '|', '&', '^']
+        if line_starts is None:
+            line_starts = _line_starts(contract_content)
+        matches = list(self._arith_re.finditer(contract_content))
+        last_line = 0
         
-        for i, line in enumerate(contract_content.split('\n'), 1):
-            if any(op in line for op in arithmetic_ops):
-                # Skip if SafeMath is being used
-                if 'SafeMath' in line or 'using SafeMath' in contract_content:
-                    continue
-                    
-                findings.append({
-                    'line': i,
-                    'severity': 'high',
-                    'pattern': 'arithmetic_operation',
-                    'description': 'Potential integer overflow/underflow in arithmetic operation',
-                    'recommendation': 'Use SafeMath or Solidity 0.8+ with built-in overflow checks'
-                })
+        for i in _match_lines(matches, line_starts):
+            if i == last_line:
+                continue
+            last_line = i
+            
+            line_end = _line_end(contract_content, line_starts, i)
+            if 'SafeMath' in contract_content[line_starts[i - 1]:line_end]:
+                continue
+            
+            findings.append(_overflow_finding(i))
         
         return findings
 
@@ -90,7 +159,12 @@ class AccessControlDetector(VulnerabilityDetector):
         self.name = "Access Control Detector"
         self.description = "Detects missing or insufficient access controls"
     
-    def detect(self, contract_path: str, contract_content: str) -> List[Dict[str, Any]]:
+    def detect(
+        self,
+        contract_path: str,
+        contract_content: str,
+        line_starts: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
         findings = []
         
         # Look for public/external functions without access control
@@ -98,7 +172,7 @@ class AccessControlDetector(VulnerabilityDetector):
         
         # Check for common access control patterns
         has_access_control = any(keyword in contract_content 
-                              for keyword in ['onlyOwner', 'onlyRole', 'require(msg.sender == owner)'])
+                              for keyword in ACCESS_CONTROL_KEYWORDS)
         
         if not has_access_control:
             findings.append({
@@ -119,3 +193,45 @@ def get_all_detectors() -> List[VulnerabilityDetector]:
         IntegerOverflowDetector(),
         AccessControlDetector(),
     ]
+
+
+# One id-tagged alternation covering the line-based detectors. The two
+# groups never share characters, so a single finditer sees every match
+# either detector would see on its own.
+_FUSED_RE = re.compile(
+    "(?P<ext>" + "|".join(f"(?:{p})" for p in EXTERNAL_CALL_PATTERNS) + ")"
+    "|(?P<arith>" + ARITHMETIC_PATTERN + ")"
+)
+_ACCESS_CONTROL_DETECTOR = AccessControlDetector()
+
+
+def fused_scan(contract_content: str) -> List[Dict[str, Any]]:
+    """Run all detectors in a single pass over the contract content.
+
+    Findings are identical to running get_all_detectors() in order.
+    """
+    line_starts = _line_starts(contract_content)
+    check_arithmetic = 'using SafeMath' not in contract_content
+    
+    reentrancy_findings = []
+    overflow_findings = []
+    last_ext_line = 0
+    last_arith_line = 0
+    
+    matches = list(_FUSED_RE.finditer(contract_content))
+    for match, i in zip(matches, _match_lines(matches, line_starts)):
+        if match.lastgroup == 'ext':
+            if i != last_ext_line:
+                last_ext_line = i
+                reentrancy_findings.append(_reentrancy_finding(i))
+        elif check_arithmetic and i != last_arith_line:
+            last_arith_line = i
+            line_end = _line_end(contract_content, line_starts, i)
+            if 'SafeMath' not in contract_content[line_starts[i - 1]:line_end]:
+                overflow_findings.append(_overflow_finding(i))
+    
+    return (
+        reentrancy_findings
+        + overflow_findings
+        + _ACCESS_CONTROL_DETECTOR.detect('', contract_content)
+    )
@@ -0,0 +1,122 @@
+"""
+Background writer that coalesces analysis result writes.
+
+Results completed at about the same time are written as one batch, and the
+renames in a batch are made durable with a single directory fsync instead
+of one fsync per file.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .utils import encode_analysis_results, write_analysis_file
+
+logger = logging.getLogger(__name__)
+
+# (output path, encoded payload, future resolved once the file is in place)
+_PendingWrite = Tuple[str, bytes, asyncio.Future]
+
+
+def _fsync_directory(path: str) -> None:
+    """fsync a directory so renames into it survive a crash (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_batch(batch: List[_PendingWrite]) -> List[Optional[BaseException]]:
+    """Write every file in the batch, then sync each parent directory once."""
+    errors: List[Optional[BaseException]] = []
+    directories = set()
+    for output_path, payload, _ in batch:
+        try:
+            write_analysis_file(payload, output_path)
+            directories.add(os.path.dirname(output_path) or ".")
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+
+    for directory in directories:
+        try:
+            _fsync_directory(directory)
+        except OSError as e:
+            logger.warning(f"Failed to sync results directory {directory}: {str(e)}")
+
+    return errors
+
+
+class ResultWriter:
+    """
+    Queue-backed writer for analysis result files.
+
+    Writes queued while a batch is being flushed are picked up together in
+    the next batch, so a lone write is not delayed waiting for company.
+    """
+
+    def __init__(self, max_batch: int = 64):
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush pending writes and stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def save(self, results: Dict[str, Any], output_path: str) -> str:
+        """Queue results for writing and wait until the file is in place."""
+        payload = encode_analysis_results(results)
+        if self._task is None:
+            # Writer not running (e.g. outside the app lifecycle); write directly
+            await asyncio.to_thread(write_analysis_file, payload, output_path)
+            return output_path
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((output_path, payload, future))
+        await future
+        return output_path
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                errors = await asyncio.to_thread(_write_batch, batch)
+            except Exception as e:
+                errors = [e] * len(batch)
+
+            for (_, _, future), error in zip(batch, errors):
+                if not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                self._queue.task_done()
+
+
+# Shared writer instance, started by the application on startup
+result_writer = ResultWriter()
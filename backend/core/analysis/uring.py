@@ -0,0 +1,173 @@
+"""
+Optional io_uring file I/O.
+
+Off by default. It is used only when ENABLE_IO_URING=1 is set, the
+liburing package (requirements-uring.txt) is installed, and the host is
+Linux with a kernel that can create a ring and supports every operation
+used here. Callers check uring_available() and use regular file I/O
+otherwise.
+"""
+
+import os
+import platform
+import threading
+
+try:
+    import liburing
+except ImportError:  # io_uring support is optional
+    liburing = None
+
+# io_uring is opt-in; regular file I/O is the default
+URING_ENABLED = os.environ.get("ENABLE_IO_URING") == "1"
+
+# Oldest kernel supporting all operations used here (IORING_OP_RENAMEAT is 5.11)
+MIN_KERNEL_VERSION = (5, 11)
+
+_available = None
+
+# Submission queue size, and the number of reads kept in flight per file
+QUEUE_DEPTH = 8
+
+# Size of each read submitted for a file
+READ_CHUNK_SIZE = 256 * 1024
+
+_local = threading.local()
+
+
+def _get_ring():
+    """Return this thread's ring, creating it on first use.
+
+    Rings are kept per thread (file I/O runs in worker threads) so the
+    setup cost is paid once rather than on every call.
+    """
+    ring = getattr(_local, "ring", None)
+    if ring is None:
+        ring = liburing.Ring()
+        liburing.io_uring_queue_init(QUEUE_DEPTH, ring)
+        _local.ring = ring
+        _local.cqe = liburing.Cqe()
+    return ring, _local.cqe
+
+
+def _kernel_version() -> tuple:
+    """Major and minor version of the running kernel, or (0, 0) if unknown."""
+    try:
+        major, minor = platform.release().split(".")[:2]
+        return int(major), int("".join(c for c in minor if c.isdigit()) or 0)
+    except ValueError:
+        return (0, 0)
+
+
+def uring_available() -> bool:
+    """Whether io_uring may be used; checked once per process.
+
+    Beyond the configuration checks, a ring is created as a probe. Old
+    kernels and sandboxes that block io_uring_setup (such as Docker's
+    default seccomp profile) fail here, and callers fall back to
+    regular file I/O.
+    """
+    global _available
+    if _available is None:
+        if (
+            not URING_ENABLED
+            or liburing is None
+            or platform.system() != "Linux"
+            or _kernel_version() < MIN_KERNEL_VERSION
+        ):
+            _available = False
+        else:
+            try:
+                _get_ring()
+                _available = True
+            except Exception:
+                _available = False
+    return _available
+
+
+def _reap(ring, cqe, count: int) -> dict:
+    """Wait for count completions; returns {user_data: result}."""
+    results = {}
+    for _ in range(count):
+        liburing.io_uring_wait_cqe(ring, cqe)
+        entry = cqe[0]
+        results[entry.user_data] = entry.res
+        liburing.io_uring_cqe_seen(ring, entry)
+    return results
+
+
+def uring_read_file(file_path: str) -> bytes:
+    """Read a whole file, keeping up to QUEUE_DEPTH reads in flight."""
+    ring, cqe = _get_ring()
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = bytearray(size)
+        view = memoryview(data)
+        buffers = [bytearray(READ_CHUNK_SIZE) for _ in range(min(QUEUE_DEPTH, -(-size // READ_CHUNK_SIZE)))]
+
+        offset = 0
+        while offset < size:
+            lengths = []
+            for i, buf in enumerate(buffers):
+                start = offset + i * READ_CHUNK_SIZE
+                if start >= size:
+                    break
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_read(sqe, fd, buf, start)
+                liburing.io_uring_sqe_set_data64(sqe, i)
+                lengths.append(min(READ_CHUNK_SIZE, size - start))
+            liburing.io_uring_submit(ring)
+            results = _reap(ring, cqe, len(lengths))
+
+            for i, expected in enumerate(lengths):
+                n = liburing.trap_error(results[i])
+                if n != expected:
+                    # Short read: the file changed underneath us
+                    raise OSError(f"Short read from {file_path}")
+                start = offset + i * READ_CHUNK_SIZE
+                view[start:start + n] = memoryview(buffers[i])[:n]
+            offset += sum(lengths)
+
+        return bytes(data)
+    finally:
+        os.close(fd)
+
+
+def uring_write_replace(payload: bytes, temp_path: str, output_path: str, durable: bool = False) -> None:
+    """Write payload to temp_path and rename it over output_path.
+
+    The write (and fsync, when durable) and the rename are linked in a
+    single submission, so the rename only happens if the data was written.
+    """
+    ring, cqe = _get_ring()
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_write(sqe, fd, payload, 0)
+        liburing.io_uring_sqe_set_flags(sqe, liburing.IOSQE_IO_LINK)
+        liburing.io_uring_sqe_set_data64(sqe, 0)
+        count = 1
+
+        if durable:
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_fsync(sqe, fd)
+            liburing.io_uring_sqe_set_flags(sqe, liburing.IOSQE_IO_LINK)
+            liburing.io_uring_sqe_set_data64(sqe, count)
+            count += 1
+
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_rename(sqe, temp_path, output_path)
+        liburing.io_uring_sqe_set_data64(sqe, count)
+        count += 1
+
+        liburing.io_uring_submit(ring)
+        results = _reap(ring, cqe, count)
+    finally:
+        os.close(fd)
+
+    written = liburing.trap_error(results[0])
+    if written != len(payload):
+        raise OSError(f"Short write to {temp_path}")
+    for i in range(1, count):
+        # A cancelled link reports -ECANCELED; trap_error raises it
+        liburing.trap_error(results[i])
@@ -3,31 +3,91 @@ Utility functions for contract analysis.
 """
 
 import os
-import json
-import hashlib
+import mmap
+import random
+import time
+from collections import Counter
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+import orjson
+from blake3 import blake3
+
+from .uring import uring_available, uring_read_file, uring_write_replace
+
+# Prefix for BLAKE3 digests, distinguishing them from older SHA-256 results
+HASH_PREFIX = "b3:"
+
+# Files at least this large are hashed using BLAKE3's multithreaded mode
+MULTITHREAD_HASH_THRESHOLD = 1024 * 1024
+
+# Read size for hashing; 4 MiB chunks are large enough for BLAKE3's
+# multithreading to pay off on each update()
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Retries when reading a result file fails: the first wait is 10 ms and
+# doubles each time, with the total wait capped at 200 ms
+LOAD_MAX_ATTEMPTS = 5
+LOAD_RETRY_BASE_DELAY = 0.01
+LOAD_RETRY_MAX_WAIT = 0.2
+
+# Below these sizes a single read()/write() beats submitting to io_uring
+URING_MIN_READ_SIZE = 256 * 1024
+URING_MIN_WRITE_SIZE = 1024 * 1024
+
+
+def _hash_stream(f, hasher, size: int) -> None:
+    """Feed an open binary file to the hasher in chunks."""
+    buf = bytearray(min(size, HASH_CHUNK_SIZE) or 1)
+    view = memoryview(buf)
+    # Read into one reusable buffer; slicing the memoryview avoids copies
+    while n := f.readinto(buf):
+        hasher.update(view[:n])
+
 
 def calculate_file_hash(file_path: str) -> str:
-    """Calculate SHA-256 hash of a file."""
-    sha256_hash = hashlib.sha256()
+    """Calculate the BLAKE3 hash of a file, returned as "b3:<hex digest>".
+
+    The file is memory-mapped so the hasher sees the whole input at once
+    (and can split it across threads); files that cannot be mapped, such
+    as empty ones, are streamed instead.
+    """
+    with open(file_path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        hasher = blake3(max_threads=blake3.AUTO if size >= MULTITHREAD_HASH_THRESHOLD else 1)
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(mm)
+        except (ValueError, OSError):
+            f.seek(0)
+            _hash_stream(f, hasher, size)
+    return HASH_PREFIX + hasher.hexdigest()
+
+
+def read_file_bytes(file_path: str) -> bytes:
+    """Read a whole file, through io_uring when it is available and the file is large."""
     with open(file_path, "rb") as f:
-        # Read and update hash in chunks of 4K
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+        if os.fstat(f.fileno()).st_size < URING_MIN_READ_SIZE or not uring_available():
+            return f.read()
+    return uring_read_file(file_path)
 
 
-def save_analysis_results(
-    results: Dict[str, Any], 
-    output_path: str
+def encode_analysis_results(results: Dict[str, Any]) -> bytes:
+    """Serialize analysis results to the JSON bytes stored on disk."""
+    return orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def write_analysis_file(
+    payload: bytes,
+    output_path: str,
+    durable: bool = False
 ) -> str:
-    """Save analysis results to a JSON file.
+    """Atomically write encoded analysis results to output_path.
     
     Args:
-        results: The analysis results to save
+        payload: JSON bytes from encode_analysis_results
         output_path: Full path to the output file
+        durable: fsync the file before it is renamed into place
         
     Returns:
         The path to the saved file
@@ -39,33 +99,21 @@ def save_analysis_results(
     temp_path = f"{output_path}.tmp"
     
     try:
-        # Write to the temp file
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2)
-            # Ensure flush to disk
-            f.flush()
-            os.fsync(f.fileno())
+        if len(payload) >= URING_MIN_WRITE_SIZE and uring_available():
+            # Write and rename are submitted together as linked operations
+            uring_write_replace(payload, temp_path, output_path, durable)
+            return output_path
         
-        # If on Windows, ensure the file handle is fully closed before renaming
-        import time
-        time.sleep(0.2)
+        # Write to the temp file
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
         
-        # Try atomic rename
-        try:
-            import shutil
-            shutil.move(temp_path, output_path)
-        except Exception:
-            # If atomic rename fails, try direct copy and remove
-            with open(temp_path, 'r', encoding='utf-8') as src:
-                with open(output_path, 'w', encoding='utf-8') as dst:
-                    dst.write(src.read())
-                    dst.flush()
-                    os.fsync(dst.fileno())
-            # Try to remove the temp file, ignore if it fails
-            try:
-                os.remove(temp_path)
-            except Exception:
-                pass
+        # Atomic rename; the temp file is in the same directory, so this
+        # never crosses devices
+        os.replace(temp_path, output_path)
     except Exception as e:
         # If anything goes wrong, clean up temp file
         try:
@@ -77,6 +125,25 @@ def save_analysis_results(
     return output_path
 
 
+def save_analysis_results(
+    results: Dict[str, Any], 
+    output_path: str,
+    durable: bool = False
+) -> str:
+    """Save analysis results to a JSON file.
+    
+    Args:
+        results: The analysis results to save
+        output_path: Full path to the output file
+        durable: fsync the file before it is renamed into place. Results can
+            be regenerated from the uploaded contract, so this is off by default.
+        
+    Returns:
+        The path to the saved file
+    """
+    return write_analysis_file(encode_analysis_results(results), output_path, durable)
+
+
 def load_analysis_results(file_path: str) -> Dict[str, Any]:
     """Load analysis results from a JSON file.
     
@@ -89,11 +156,10 @@ def load_analysis_results(file_path: str) -> Dict[str, Any]:
     Raises:
         FileNotFoundError: If the file doesn't exist
         PermissionError: If the file can't be accessed
-        json.JSONDecodeError: If the file contains invalid JSON
+        ValueError: If the file contains invalid JSON
     """
     # Maximum number of attempts to read the file
-    max_attempts = 3
-    backoff_delay = 0.5  # Start with 0.5 seconds
+    max_attempts = LOAD_MAX_ATTEMPTS
     
     # Check if file exists
     if not os.path.exists(file_path):
@@ -104,21 +170,29 @@ def load_analysis_results(file_path: str) -> Dict[str, Any]:
         raise ValueError(f"Analysis result file is empty: {file_path}")
     
     last_error = None
-    import time
+    waited = 0.0
     
     # Try multiple times with backoff
     for attempt in range(max_attempts):
         try:
-            # Use binary mode and decode manually to avoid encoding issues
+            # orjson parses the raw bytes directly
             with open(file_path, 'rb') as f:
                 data = f.read()
-                return json.loads(data.decode('utf-8'))
+            return orjson.loads(data)
         except (PermissionError, OSError) as e:
             # If permission error or file locked, wait and retry
             last_error = e
-            time.sleep(backoff_delay)
-            backoff_delay *= 2  # Exponential backoff
-        except json.JSONDecodeError as e:
+            if attempt == max_attempts - 1:
+                break
+            # Exponential backoff with jitter, so concurrent readers of the
+            # same file spread out; total waiting is capped
+            delay = min(LOAD_RETRY_BASE_DELAY * (2 ** attempt), LOAD_RETRY_MAX_WAIT - waited)
+            if delay <= 0:
+                break
+            delay *= random.uniform(0.75, 1.25)
+            time.sleep(delay)
+            waited += delay
+        except orjson.JSONDecodeError as e:
             # Don't retry for JSON decode errors
             raise ValueError(f"Invalid JSON in analysis result file: {e}")
     
@@ -129,18 +203,18 @@ def load_analysis_results(file_path: str) -> Dict[str, Any]:
         raise OSError(f"Failed to read analysis result file: {file_path}")
 
 
+_SEVERITY_FORMATS = {
+    'high': '🔴 HIGH',
+    'medium': '🟠 MEDIUM',
+    'low': '🟡 LOW',
+    'info': '🔵 INFO',
+}
+
+
 def format_severity(severity: str) -> str:
     """Format severity level with color coding."""
     severity = severity.lower()
-    if severity == 'high':
-        return '🔴 HIGH'
-    elif severity == 'medium':
-        return '🟠 MEDIUM'
-    elif severity == 'low':
-        return '🟡 LOW'
-    elif severity == 'info':
-        return '🔵 INFO'
-    return severity
+    return _SEVERITY_FORMATS.get(severity, severity)
 
 def get_contract_name(file_path: str) -> str:
     """Extract contract name from file path."""
@@ -151,17 +225,11 @@ def count_vulnerabilities_by_severity(
     findings: List[Dict[str, Any]]
 ) -> Dict[str, int]:
     """Count vulnerabilities by severity level."""
-    counts = {
-        'high': 0,
-        'medium': 0,
-        'low': 0,
-        'info': 0,
+    counts = Counter(finding.get('severity', 'info').lower() for finding in findings)
+    return {
+        'high': counts['high'],
+        'medium': counts['medium'],
+        'low': counts['low'],
+        'info': counts['info'],
         'total': len(findings)
     }
-    
-    for finding in findings:
-        severity = finding.get('severity', 'info').lower()
-        if severity in counts:
-            counts[severity] += 1
-    
-    return counts
@@ -3,29 +3,75 @@ Event Emitter for Smart Contract Analysis Service
 This module provides functionality to emit real-time WebSocket events during analysis.
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from uuid import UUID
 
 from websocket import manager
 from websocket.events import (
     EventType,
-    analysis_progress_event,
+    progress_event,
+    vulnerability_event,
     analysis_complete_event,
-    analysis_error_event,
-    vulnerability_detected_event,
-    VulnerabilityData
+    analysis_error_event
 )
 
 logger = logging.getLogger(__name__)
 
+# Progress updates are coalesced and flushed at most this often (seconds)
+PROGRESS_FLUSH_INTERVAL = 0.05
+
+# Progress updates within this fraction of the last one, on the same step,
+# are dropped; clients can't show the difference
+PROGRESS_MIN_DELTA = 0.01
+
 class AnalysisEventEmitter:
     """
     Event emitter for the analysis service that handles WebSocket events
     """
     
+    # Latest unsent progress event per analysis: {analysis_id: (event, user_id)}
+    _pending_progress: Dict[str, Tuple[bytes, Optional[str]]] = {}
+    _flush_task: Optional[asyncio.Task] = None
+    # Last queued (percent, step) per analysis, for dropping near-duplicates
+    _last_progress: Dict[str, Tuple[float, str]] = {}
+    
     @staticmethod
+    async def _send(event: bytes, user_id: Optional[str] = None) -> None:
+        """
+        Send an encoded event to a user's connections, or to everyone
+        """
+        payload = event.decode()
+        if user_id:
+            await manager.send_to_user_encoded(user_id, payload)
+        else:
+            await manager.broadcast_encoded(payload)
+    
+    @classmethod
+    async def flush_progress(cls) -> None:
+        """
+        Send all pending progress events immediately
+        """
+        pending = cls._pending_progress
+        cls._pending_progress = {}
+        for analysis_id, (event, user_id) in pending.items():
+            try:
+                await cls._send(event, user_id)
+            except Exception as e:
+                logger.error(f"Failed to emit progress event for analysis {analysis_id}: {str(e)}")
+    
+    @classmethod
+    async def _flush_progress_later(cls) -> None:
+        try:
+            await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+            await cls.flush_progress()
+        finally:
+            cls._flush_task = None
+    
+    @classmethod
     async def emit_progress(
+        cls,
         analysis_id: str, 
         percent: float, 
         step: str, 
@@ -33,7 +79,12 @@ class AnalysisEventEmitter:
         user_id: Optional[str] = None
     ) -> None:
         """
-        Emit a progress update event
+        Queue a progress update event
+        
+        Updates less than PROGRESS_MIN_DELTA from the previous one on the same
+        step are dropped. Only the latest update per analysis is kept; pending
+        updates are sent within PROGRESS_FLUSH_INTERVAL, or before a
+        completion/error event.
         
         Args:
             analysis_id: The ID of the analysis
@@ -42,23 +93,18 @@ class AnalysisEventEmitter:
             details: Optional details about the current step
             user_id: Optional user ID to send the event to (if None, broadcast)
         """
-        progress_data = {
-            "percent": percent,
-            "step": step,
-            "details": details
-        }
+        prev = cls._last_progress.get(analysis_id)
+        if prev is not None and prev[1] == step and abs(percent - prev[0]) < PROGRESS_MIN_DELTA:
+            return
+        cls._last_progress[analysis_id] = (percent, step)
         
-        event = analysis_progress_event(analysis_id, progress_data)
+        event = progress_event(analysis_id, percent, step, details)
+        cls._pending_progress[analysis_id] = (event, user_id)
         
-        try:
-            if user_id:
-                await manager.send_to_user(user_id, event)
-            else:
-                await manager.broadcast(event)
-                
-            logger.debug(f"Emitted progress event for analysis {analysis_id}: {percent:.0%} - {step}")
-        except Exception as e:
-            logger.error(f"Failed to emit progress event: {str(e)}")
+        if cls._flush_task is None:
+            cls._flush_task = asyncio.create_task(cls._flush_progress_later())
+            
+        logger.debug(f"Queued progress event for analysis {analysis_id}: {percent:.0%} - {step}")
     
     @staticmethod
     async def emit_vulnerability_detected(
@@ -82,21 +128,10 @@ class AnalysisEventEmitter:
             line_number: Optional line number where vulnerability was found
             user_id: Optional user ID to send the event to (if None, broadcast)
         """
-        vulnerability = VulnerabilityData(
-            type=vuln_type,
-            severity=severity,
-            description=description,
-            file_name=file_name,
-            line_number=line_number
-        )
-        
-        event = vulnerability_detected_event(analysis_id, vulnerability)
+        event = vulnerability_event(analysis_id, vuln_type, severity, description, file_name, line_number)
         
         try:
-            if user_id:
-                await manager.send_to_user(user_id, event)
-            else:
-                await manager.broadcast(event)
+            await AnalysisEventEmitter._send(event, user_id)
                 
             logger.debug(f"Emitted vulnerability event for analysis {analysis_id}: {vuln_type} ({severity})")
         except Exception as e:
@@ -128,12 +163,13 @@ class AnalysisEventEmitter:
         }
         
         event = analysis_complete_event(analysis_data, results_summary)
+        AnalysisEventEmitter._last_progress.pop(analysis_id, None)
+        
+        # Don't let a queued progress update arrive after the terminal event
+        await AnalysisEventEmitter.flush_progress()
         
         try:
-            if user_id:
-                await manager.send_to_user(user_id, event)
-            else:
-                await manager.broadcast(event)
+            await AnalysisEventEmitter._send(event, user_id)
                 
             logger.info(f"Emitted completion event for analysis {analysis_id}")
         except Exception as e:
@@ -154,12 +190,13 @@ class AnalysisEventEmitter:
             user_id: Optional user ID to send the event to (if None, broadcast)
         """
         event = analysis_error_event(analysis_id, error)
+        AnalysisEventEmitter._last_progress.pop(analysis_id, None)
+        
+        # Don't let a queued progress update arrive after the terminal event
+        await AnalysisEventEmitter.flush_progress()
         
         try:
-            if user_id:
-                await manager.send_to_user(user_id, event)
-            else:
-                await manager.broadcast(event)
+            await AnalysisEventEmitter._send(event, user_id)
                 
             logger.error(f"Emitted error event for analysis {analysis_id}: {error}")
         except Exception as e:
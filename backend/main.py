@@ -1,30 +1,35 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 from core.vulnerability_detector import Severity
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+import asyncio
 import os
 import uuid
-import shutil
 from pathlib import Path
 from datetime import datetime
 import logging
+from collections import Counter
+import aiofiles
+from blake3 import blake3
+from cachetools import TTLCache
 
 # Import WebSocket components
 from websocket.router import include_websocket_routes
 from websocket import manager, EventType
-from websocket.events import analysis_progress_event, analysis_complete_event, analysis_error_event
+from websocket.events import progress_event, analysis_complete_event, analysis_error_event
 
 # Import analysis modules
 from core.vulnerability_detector import VulnerabilityDetector
 from core.analysis.utils import (
+    HASH_PREFIX,
     calculate_file_hash,
-    save_analysis_results,
-    load_analysis_results,
+    read_file_bytes,
     count_vulnerabilities_by_severity
 )
+from core.analysis.result_writer import result_writer
 
 # Initialize vulnerability detector
 vulnerability_detector = VulnerabilityDetector()
@@ -63,7 +68,8 @@ os.makedirs(settings.results_folder, exist_ok=True)
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    description="API for analyzing smart contract vulnerabilities"
+    description="API for analyzing smart contract vulnerabilities",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -105,114 +111,149 @@ class AnalysisRequest(BaseModel):
     contract_code: Optional[str] = None
     file_id: Optional[str] = None
 
-# In-memory storage for analysis status (in production, use a database)
-analysis_status: Dict[str, AnalysisStatus] = {}
+# Analysis statuses are kept for a day, and at most this many at once
+STATUS_TTL_SECONDS = 24 * 60 * 60
+STATUS_MAX_ENTRIES = 10_000
+
+# Number of statuses dropped by the TTL or size cap
+status_evictions = 0
+
+class StatusCache(TTLCache):
+    """TTLCache of analysis statuses that counts evictions"""
+
+    def _evict(self, analysis_id: str):
+        global status_evictions
+        status_evictions += 1
+        logger.debug(f"Evicted status for analysis {analysis_id} ({status_evictions} total)")
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._evict(key)
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, _ in expired:
+            self._evict(key)
+        return expired
+
+# In-memory storage for analysis status (in production, use a database).
+# Each entry is a plain (state, progress, message) tuple so status updates
+# skip Pydantic; an AnalysisStatus is only built when a response needs one.
+# Only set_analysis_status writes entries, and reads use .get() since an
+# entry can expire while its analysis is still running.
+analysis_statuses: Dict[str, Tuple[str, int, Optional[str]]] = StatusCache(
+    maxsize=STATUS_MAX_ENTRIES, ttl=STATUS_TTL_SECONDS
+)
+
+def set_analysis_status(analysis_id: str, state: str, progress: int, message: Optional[str]):
+    """Record the current status of an analysis"""
+    analysis_statuses[analysis_id] = (state, progress, message)
+
+def get_analysis_status_model(analysis_id: str) -> Optional[AnalysisStatus]:
+    """Build an AnalysisStatus for an analysis, or None if it is unknown"""
+    status = analysis_statuses.get(analysis_id)
+    if status is None:
+        return None
+    state, progress, message = status
+    return AnalysisStatus(
+        id=analysis_id,
+        status=state,
+        progress=progress,
+        message=message
+    )
+
+# Uploads are copied and hashed in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Hashes of uploaded files, recorded at upload time: {file_id: hash}.
+# Bounded like the statuses; analyses rehash the file on a miss.
+file_hashes: Dict[str, str] = TTLCache(
+    maxsize=STATUS_MAX_ENTRIES, ttl=STATUS_TTL_SECONDS
+)
 
 # Helper functions
-async def analyze_contract_sync(file_path: str, analysis_id: str, user_id: str = None):
+def read_contract_source(file_path: str) -> str:
+    """Read a contract file, falling back to latin1 if it is not valid UTF-8"""
+    raw = read_file_bytes(file_path)
+    try:
+        source_code = raw.decode('utf-8')
+        logger.info(f"Successfully read {len(source_code)} bytes from {file_path}")
+    except UnicodeDecodeError:
+        # Try different encoding if UTF-8 fails
+        source_code = raw.decode('latin1')
+        logger.info(f"Used latin1 encoding to read {len(source_code)} bytes from {file_path}")
+    # Normalize newlines the way text-mode open() does
+    return source_code.replace('\r\n', '\n').replace('\r', '\n')
+
+async def analyze_contract_sync(file_path: str, analysis_id: str, user_id: str = None, file_id: str = None):
     """Synchronous function to analyze a contract"""
     try:
         logger.info(f"Starting analysis for {analysis_id} with file {file_path}")
         # Initialize status
-        analysis_status[analysis_id] = AnalysisStatus(
-            id=analysis_id,
-            status="processing",
-            progress=0,
-            message="Starting analysis"
-        )
-        
-        # Update status
-        status = analysis_status[analysis_id]
-        status.progress = 10
-        status.message = "Initializing analysis"
+        set_analysis_status(analysis_id, "processing", 10, "Initializing analysis")
         
         # Send initial WebSocket event
+        event = progress_event(analysis_id, 0.0, "Initializing analysis", "Preparing contract analysis")
         if user_id:
-            await manager.send_to_user(user_id, analysis_progress_event(analysis_id, {
-                "percent": 0.0,
-                "step": "Initializing analysis",
-                "details": "Preparing contract analysis"
-            }))
+            await manager.send_to_user(user_id, event)
         else:
-            await manager.broadcast(analysis_progress_event(analysis_id, {
-                "percent": 0.0,
-                "step": "Initializing analysis",
-                "details": "Preparing contract analysis"
-            }))
+            await manager.broadcast(event)
         
         # Check if file exists
-        if not os.path.exists(file_path):
+        if not await asyncio.to_thread(os.path.exists, file_path):
             raise FileNotFoundError(f"Contract file not found at {file_path}")
             
         # Read the contract content
-        status.progress = 20
-        status.message = "Loading contract"
+        set_analysis_status(analysis_id, "processing", 20, "Loading contract")
         
         # Send progress WebSocket event
+        event = progress_event(analysis_id, 0.25, "Loading contract", "Parsing Solidity code")
         if user_id:
-            await manager.send_to_user(user_id, analysis_progress_event(analysis_id, {
-                "percent": 0.25,
-                "step": "Loading contract",
-                "details": "Parsing Solidity code"
-            }))
+            await manager.send_to_user(user_id, event)
         else:
-            await manager.broadcast(analysis_progress_event(analysis_id, {
-                "percent": 0.25,
-                "step": "Loading contract",
-                "details": "Parsing Solidity code"
-            }))
+            await manager.broadcast(event)
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                source_code = f.read()
-            logger.info(f"Successfully read {len(source_code)} bytes from {file_path}")
-        except UnicodeDecodeError:
-            # Try different encoding if UTF-8 fails
-            with open(file_path, 'r', encoding='latin1') as f:
-                source_code = f.read()
-            logger.info(f"Used latin1 encoding to read {len(source_code)} bytes from {file_path}")
+        # File I/O runs in a worker thread so the event loop keeps serving
+        # WebSocket traffic while the contract is read and hashed
+        source_code = await asyncio.to_thread(read_contract_source, file_path)
         
         # Check if content is empty
         if not source_code or len(source_code.strip()) == 0:
             raise ValueError(f"Contract file is empty at {file_path}")
         
         # Update status
-        status.progress = 50
-        status.message = "Running analysis"
+        set_analysis_status(analysis_id, "processing", 50, "Running analysis")
         
         # Send progress WebSocket event
+        event = progress_event(analysis_id, 0.50, "Running analysis", "Detecting vulnerabilities")
         if user_id:
-            await manager.send_to_user(user_id, analysis_progress_event(analysis_id, {
-                "percent": 0.50,
-                "step": "Running analysis",
-                "details": "Detecting vulnerabilities"
-            }))
+            await manager.send_to_user(user_id, event)
         else:
-            await manager.broadcast(analysis_progress_event(analysis_id, {
-                "percent": 0.50,
-                "step": "Running analysis",
-                "details": "Detecting vulnerabilities"
-            }))
+            await manager.broadcast(event)
         
         # Run vulnerability detection
         logger.info(f"Running vulnerability detection for {analysis_id}")
         vulnerabilities = vulnerability_detector.detect_vulnerabilities(source_code)
         logger.info(f"Found {len(vulnerabilities)} vulnerabilities for {analysis_id}")
         
+        file_hash = file_hashes.get(file_id) if file_id else None
+        if file_hash is None:
+            file_hash = await asyncio.to_thread(calculate_file_hash, file_path)
+        
         # Count vulnerabilities by severity
+        # Severity members hash by name, so count their values
+        counts = Counter(
+            vuln["severity"].value if isinstance(vuln["severity"], Severity) else vuln["severity"]
+            for vuln in vulnerabilities
+        )
         severity_counts = {
-            "high": 0,
-            "medium": 0,
-            "low": 0,
-            "info": 0
+            "high": counts["high"],
+            "medium": counts["medium"],
+            "low": counts["low"],
+            "info": counts["info"]
         }
         
-        for vuln in vulnerabilities:
-            severity = vuln["severity"]
-            if isinstance(severity, Severity):
-                severity = severity.value
-            severity_counts[severity] += 1
-        
         # Prepare analysis result
         analysis_result = {
             "id": analysis_id,
@@ -224,44 +265,35 @@ async def analyze_contract_sync(file_path: str, analysis_id: str, user_id: str =
                 "total": len(vulnerabilities),
                 **severity_counts,
             },
-            "file_hash": calculate_file_hash(file_path),
+            "file_hash": file_hash,
             "success": True
         }
         
         # Update status
-        status.progress = 75
-        status.message = "Processing results"
+        set_analysis_status(analysis_id, "processing", 75, "Processing results")
         
         # Send progress WebSocket event
+        event = progress_event(analysis_id, 0.75, "Processing results", "Generating vulnerability report")
         if user_id:
-            await manager.send_to_user(user_id, analysis_progress_event(analysis_id, {
-                "percent": 0.75,
-                "step": "Processing results",
-                "details": "Generating vulnerability report"
-            }))
+            await manager.send_to_user(user_id, event)
         else:
-            await manager.broadcast(analysis_progress_event(analysis_id, {
-                "percent": 0.75,
-                "step": "Processing results",
-                "details": "Generating vulnerability report"
-            }))
+            await manager.broadcast(event)
         
         # Save the result
         result_file = os.path.join(settings.results_folder, f"{analysis_id}.json")
         logger.info(f"Saving analysis result to {result_file}")
         
-        # Use the improved save_analysis_results function which handles atomic writes
+        # Writes are batched with other completed analyses; each file is
+        # written to a temp path and renamed into place
         try:
-            save_analysis_results(analysis_result, result_file)
+            await result_writer.save(analysis_result, result_file)
             logger.info(f"Successfully saved analysis result to {result_file}")
         except Exception as save_error:
             logger.error(f"Error saving analysis result: {str(save_error)}")
             raise
         
         # Update status with completion
-        status.status = "completed"
-        status.progress = 100
-        status.message = "Analysis complete"
+        set_analysis_status(analysis_id, "completed", 100, "Analysis complete")
         
         # Send completion WebSocket event
         analysis_data = {
@@ -290,10 +322,8 @@ async def analyze_contract_sync(file_path: str, analysis_id: str, user_id: str =
         
     except Exception as e:
         logger.error(f"Error analyzing contract {analysis_id}: {str(e)}")
-        if analysis_id in analysis_status:
-            analysis_status[analysis_id].status = "failed"
-            analysis_status[analysis_id].progress = 0
-            analysis_status[analysis_id].message = f"Analysis failed: {str(e)}"
+        if analysis_id in analysis_statuses:
+            set_analysis_status(analysis_id, "failed", 0, f"Analysis failed: {str(e)}")
             
             # Send error WebSocket event
             error_message = f"Analysis failed: {str(e)}"
@@ -332,8 +362,14 @@ async def upload_contract(file: UploadFile = File(...)):
     
     # Save the uploaded file
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Hash while copying so the file is never re-read just to hash it,
+        # and analyses of this upload don't have to hash it either
+        hasher = blake3()
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
+                hasher.update(chunk)
+        file_hashes[file_id] = HASH_PREFIX + hasher.hexdigest()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
     
@@ -360,13 +396,7 @@ async def analyze_contract(
     analysis_id = str(uuid.uuid4())
     
     # Initialize analysis status
-    status = AnalysisStatus(
-        id=analysis_id,
-        status="queued",
-        progress=0,
-        message="Analysis queued"
-    )
-    analysis_status[analysis_id] = status
+    set_analysis_status(analysis_id, "queued", 0, "Analysis queued")
     
     file_path = None
     
@@ -402,15 +432,13 @@ async def analyze_contract(
         # Extract user_id from request if available (simplified, in production use proper auth)
         user_id = None  # In production: extract from request authentication
         
-        background_tasks.add_task(analyze_contract_sync, file_path, analysis_id, user_id)
+        background_tasks.add_task(analyze_contract_sync, file_path, analysis_id, user_id, file_id)
         
-        return analysis_status[analysis_id]
+        return get_analysis_status_model(analysis_id)
         
     except Exception as e:
         logger.error(f"Error in analyze_contract: {str(e)}")
-        analysis_status[analysis_id].status = "failed"
-        analysis_status[analysis_id].progress = 0
-        analysis_status[analysis_id].message = f"Analysis failed: {str(e)}"
+        set_analysis_status(analysis_id, "failed", 0, f"Analysis failed: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=str(e)
@@ -422,14 +450,14 @@ async def get_analysis_result(analysis_id: str):
     result_path = os.path.join(settings.results_folder, f"{analysis_id}.json")
     
     # First check the analysis status
-    status = analysis_status.get(analysis_id)
+    status = get_analysis_status_model(analysis_id)
     
     # If we have status in memory
     if status:
         if status.status == "processing" or status.status == "queued":
             # Analysis is still in progress, return status with 202 code
             logger.info(f"Analysis {analysis_id} still in progress: {status.status}, progress: {status.progress}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=202,
                 content=status.dict()
             )
@@ -444,25 +472,18 @@ async def get_analysis_result(analysis_id: str):
         raise HTTPException(status_code=404, detail=f"Analysis result not found for ID {analysis_id}")
     
     try:
-        # Try to load the result file with improved handling
+        # The stored file is already the JSON response body, so send its
+        # bytes as-is instead of parsing and re-serializing them
         logger.info(f"Attempting to load analysis result for {analysis_id} from {result_path}")
-        result = load_analysis_results(result_path)
+        data = await asyncio.to_thread(read_file_bytes, result_path)
         logger.info(f"Successfully loaded results for analysis {analysis_id}")
-        return result
+        return Response(content=data, media_type="application/json")
     except FileNotFoundError:
         logger.error(f"Analysis result file disappeared: {result_path}")
         raise HTTPException(status_code=404, detail="Analysis result file disappeared")
     except PermissionError as pe:
         logger.error(f"Permission error reading analysis result: {str(pe)}")
-        # Check if it might be a file locking issue
-        import time
-        time.sleep(0.5)  # Wait a moment
-        try:
-            # Try one more time after a short delay
-            result = load_analysis_results(result_path)
-            return result
-        except Exception as retry_error:
-            raise HTTPException(status_code=500, detail=f"Permission error accessing result file: {str(retry_error)}")
+        raise HTTPException(status_code=500, detail=f"Permission error accessing result file: {str(pe)}")
     except Exception as e:
         logger.error(f"Error loading analysis result for {analysis_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error loading analysis result: {str(e)}")
@@ -470,7 +491,7 @@ async def get_analysis_result(analysis_id: str):
 @app.get("/api/analysis/{analysis_id}/status", response_model=AnalysisStatus)
 async def get_analysis_status(analysis_id: str):
     """Get the status of an analysis"""
-    status = analysis_status.get(analysis_id)
+    status = get_analysis_status_model(analysis_id)
     if not status:
         # Check if result exists
         result_path = os.path.join(settings.results_folder, f"{analysis_id}.json")
@@ -497,9 +518,18 @@ async def startup_event():
     os.makedirs(settings.upload_folder, exist_ok=True)
     os.makedirs(settings.results_folder, exist_ok=True)
     
+    # Start the batched result writer
+    result_writer.start()
+    
     # Log WebSocket initialization
     logger.info("WebSocket service initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush any queued result files
+    await result_writer.stop()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from websocket.protocol import DeflateWebSocketProtocol
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws=DeflateWebSocketProtocol)
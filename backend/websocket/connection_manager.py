@@ -1,6 +1,26 @@
-from typing import Dict, List
+import asyncio
+from typing import Dict, List, Optional, Set, Union
 from fastapi import WebSocket
-from uuid import UUID
+
+import orjson
+
+# Most queued messages coalesced into one frame
+MAX_FRAME_MESSAGES = 128
+
+# Messages a client may have waiting before it is treated as dead
+MAX_QUEUED_MESSAGES = 1024
+
+# Close code sent to clients dropped for falling behind ("try again later")
+STALLED_CLOSE_CODE = 1013
+
+
+def _encode(message: Union[dict, bytes]) -> str:
+    """
+    Text payload for a message; events from websocket.events arrive already encoded
+    """
+    if isinstance(message, bytes):
+        return message.decode()
+    return orjson.dumps(message).decode()
 
 
 class ConnectionManager:
@@ -9,29 +29,38 @@ class ConnectionManager:
     """
     def __init__(self):
         # All active connections: {client_id: WebSocket}
-        self.active_connections: Dict[UUID, WebSocket] = {}
-        # User connections map: {user_id: [client_id1, client_id2, ...]}
-        self.user_connections: Dict[str, List[UUID]] = {}
+        self.active_connections: Dict[str, WebSocket] = {}
+        # User connections map: {user_id: {client_id1, client_id2, ...}}
+        self.user_connections: Dict[str, Set[str]] = {}
+        # Outgoing messages per client, drained by one writer task each
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+        # Pending closes of stalled sockets, referenced until they finish
+        self._closing: Set[asyncio.Task] = set()
 
-    async def connect(self, websocket: WebSocket, client_id: UUID, user_id: str = None):
+    async def connect(self, websocket: WebSocket, client_id: str, user_id: str = None):
         """
         Connect a client and associate it with a user if provided
         """
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        queue = asyncio.Queue(maxsize=MAX_QUEUED_MESSAGES)
+        self._queues[client_id] = queue
+        self._writers[client_id] = asyncio.create_task(self._write_loop(client_id, websocket, queue))
         
         # Associate with user if authenticated
         if user_id:
             if user_id not in self.user_connections:
-                self.user_connections[user_id] = []
-            self.user_connections[user_id].append(client_id)
+                self.user_connections[user_id] = set()
+            self.user_connections[user_id].add(client_id)
 
-    def disconnect(self, client_id: UUID, user_id: str = None):
+    def disconnect(self, client_id: str, user_id: str = None):
         """
         Disconnect a client and remove from user associations
         """
         if client_id in self.active_connections:
             del self.active_connections[client_id]
+        self._stop_writer(client_id)
         
         # Remove from user connections if needed
         if user_id and user_id in self.user_connections:
@@ -41,28 +70,118 @@ class ConnectionManager:
                 if not self.user_connections[user_id]:
                     del self.user_connections[user_id]
 
-    async def send_message(self, message: dict, client_id: UUID):
+    def _stop_writer(self, client_id: str):
+        self._queues.pop(client_id, None)
+        writer = self._writers.pop(client_id, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+
+    async def _write_loop(self, client_id: str, websocket: WebSocket, queue: asyncio.Queue):
+        """
+        Send a client's queued messages, coalescing whatever has queued up
+        while the previous frame was being sent into one JSON array frame
+        """
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < MAX_FRAME_MESSAGES:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            
+            # A lone message keeps the plain single-event frame format
+            frame = batch[0] if len(batch) == 1 else "[" + ",".join(batch) + "]"
+            try:
+                await websocket.send_text(frame)
+            except Exception:
+                # The client has gone away
+                self._prune([client_id])
+                return
+
+    def _enqueue(self, client_id: str, payload: str) -> Optional[str]:
+        """
+        Queue a payload for a client; returns the client_id if its queue is full
+        """
+        queue = self._queues.get(client_id)
+        if queue is None:
+            return None
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            return client_id
+        return None
+
+    async def send_message(self, message: Union[dict, bytes], client_id: str):
         """
         Send a message to a specific client
         """
-        if client_id in self.active_connections:
-            websocket = self.active_connections[client_id]
-            await websocket.send_json(message)
+        # Encoded with orjson rather than send_json's json.dumps
+        if self._enqueue(client_id, _encode(message)) is not None:
+            self._prune([client_id], close=True)
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, message: Union[dict, bytes]):
         """
         Broadcast a message to all connected clients
         """
-        for websocket in self.active_connections.values():
-            await websocket.send_json(message)
+        await self.broadcast_encoded(_encode(message))
 
-    async def send_to_user(self, user_id: str, message: dict):
+    async def broadcast_encoded(self, payload: str):
+        """
+        Broadcast an already JSON-encoded message to all connected clients
+        """
+        # Clients that can't keep up are dropped rather than queued without bound
+        stalled = [
+            client_id for client_id in list(self._queues)
+            if self._enqueue(client_id, payload) is not None
+        ]
+        if stalled:
+            self._prune(stalled, close=True)
+
+    def _prune(self, client_ids: List[str], close: bool = False):
+        """
+        Drop connections whose sends failed or stalled; with close, also close
+        their sockets so the client sees the disconnect and reconnects
+        """
+        stale = set(client_ids)
+        for client_id in stale:
+            websocket = self.active_connections.pop(client_id, None)
+            self._stop_writer(client_id)
+            if close and websocket is not None:
+                task = asyncio.create_task(self._close(websocket))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+        for user_id in list(self.user_connections):
+            remaining = self.user_connections[user_id] - stale
+            if remaining:
+                self.user_connections[user_id] = remaining
+            else:
+                del self.user_connections[user_id]
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=STALLED_CLOSE_CODE)
+        except Exception:
+            # Already closed by the other side
+            pass
+
+    async def send_to_user(self, user_id: str, message: Union[dict, bytes]):
         """
         Send a message to all connections of a specific user
         """
+        await self.send_to_user_encoded(user_id, _encode(message))
+
+    async def send_to_user_encoded(self, user_id: str, payload: str):
+        """
+        Send an already JSON-encoded message to all connections of a specific user
+        """
         if user_id in self.user_connections:
-            for client_id in self.user_connections[user_id]:
-                await self.send_message(message, client_id)
+            stalled = [
+                client_id for client_id in list(self.user_connections[user_id])
+                if self._enqueue(client_id, payload) is not None
+            ]
+            if stalled:
+                self._prune(stalled, close=True)
 
 
 # Global connection manager instance
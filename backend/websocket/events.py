@@ -1,6 +1,9 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from enum import Enum
-from typing import Dict, Any, Optional, List
-from pydantic import BaseModel
+from typing import Dict, Any, Optional, Union
+import orjson
 
 
 class EventType(str, Enum):
@@ -17,7 +20,18 @@ class EventType(str, Enum):
     SYSTEM_NOTIFICATION = "system_notification"
 
 
-class ProgressData(BaseModel):
+# Plain-str event names for the factories below, so building an event
+# doesn't go through the enum's .value descriptor
+_EVT_STARTED = EventType.ANALYSIS_STARTED.value
+_EVT_PROGRESS = EventType.ANALYSIS_PROGRESS.value
+_EVT_COMPLETE = EventType.ANALYSIS_COMPLETE.value
+_EVT_ERROR = EventType.ANALYSIS_ERROR.value
+_EVT_VULNERABILITY = EventType.VULNERABILITY_DETECTED.value
+_EVT_BATCH_PROGRESS = EventType.BATCH_PROGRESS.value
+
+
+@dataclass
+class ProgressData:
     """
     Data model for progress updates
     """
@@ -26,30 +40,33 @@ class ProgressData(BaseModel):
     details: Optional[str] = None
     
 
-class VulnerabilityData(BaseModel):
+@dataclass
+class VulnerabilityData:
     """
     Data model for detected vulnerabilities
     """
     type: str
     severity: str
-    line_number: Optional[int] = None
     description: str
     file_name: str
+    line_number: Optional[int] = None
 
 
-class AnalysisData(BaseModel):
+@dataclass
+class AnalysisData:
     """
     Data model for analysis metadata
     """
     analysis_id: str
     contract_name: str
     file_count: int
+    status: str
     start_time: Optional[str] = None
     end_time: Optional[str] = None
-    status: str
 
 
-class BatchData(BaseModel):
+@dataclass
+class BatchData:
     """
     Data model for batch processing updates
     """
@@ -61,7 +78,8 @@ class BatchData(BaseModel):
     estimated_completion_time: Optional[str] = None
 
 
-class WebSocketEvent(BaseModel):
+@dataclass
+class WebSocketEvent:
     """
     Base model for all WebSocket events
     """
@@ -70,78 +88,169 @@ class WebSocketEvent(BaseModel):
     timestamp: str
 
 
-def create_event(event_type: EventType, data: Dict[str, Any]) -> Dict:
+# Most recently formatted second: (epoch seconds, "YYYY-MM-DDTHH:MM:SS")
+_ts_cache = (0, "")
+
+
+def _iso_second(t: int) -> str:
+    """
+    ISO-8601 UTC text for an epoch second, reformatted only when the second changes
+    """
+    global _ts_cache
+    cached_t, text = _ts_cache
+    if t != cached_t:
+        text = datetime.fromtimestamp(t, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        _ts_cache = (t, text)
+    return text
+
+
+def _now_iso() -> str:
+    """
+    Current UTC time as "YYYY-MM-DDTHH:MM:SS.ffffffZ", the timestamp format of every event
     """
-    Create a formatted WebSocket event with timestamp
+    ns = time.time_ns()
+    return f"{_iso_second(ns // 1_000_000_000)}.{ns // 1000 % 1_000_000:06d}Z"
+
+
+def create_event(event_type: Union[EventType, str], data: Any) -> bytes:
     """
-    from datetime import datetime
+    Create a JSON-encoded WebSocket event with timestamp
     
-    return {
-        "event": event_type,
+    data may be a dict, one of the dataclasses above (orjson encodes them
+    natively) or an orjson.Fragment of pre-encoded JSON. Formatting the
+    date and time is amortized across all events in the same second.
+    """
+    return orjson.dumps({
+        "event": event_type.value if isinstance(event_type, EventType) else event_type,
         "data": data,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+        "timestamp": _now_iso()
+    }, option=orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC)
 
 
-def analysis_started_event(analysis_data: AnalysisData) -> Dict:
+def analysis_started_event(analysis_data: AnalysisData) -> bytes:
     """
     Create an analysis started event
     """
-    data = analysis_data if isinstance(analysis_data, dict) else analysis_data.model_dump()
     return create_event(
-        EventType.ANALYSIS_STARTED,
-        data
+        _EVT_STARTED,
+        analysis_data
     )
 
 
-def analysis_progress_event(analysis_id: str, progress: Dict | ProgressData) -> Dict:
+def analysis_progress_event(analysis_id: str, progress: Dict) -> bytes:
+    """
+    Create a progress update event from a progress dict
+    """
+    return create_event(_EVT_PROGRESS, {"analysis_id": analysis_id, **progress})
+
+
+def progress_event_from_model(analysis_id: str, progress: ProgressData) -> bytes:
+    """
+    Create a progress update event from a ProgressData model
+    """
+    return progress_event(analysis_id, progress.percent, progress.step, progress.details)
+
+
+def analysis_complete_event(analysis_data: Dict, results_summary: Dict) -> bytes:
+    """
+    Create an analysis complete event from an analysis data dict
+    """
+    return create_event(_EVT_COMPLETE, {**analysis_data, "results_summary": results_summary})
+
+
+def complete_event_from_model(analysis_data: AnalysisData, results_summary: Dict) -> bytes:
     """
-    Create a progress update event
+    Create an analysis complete event from an AnalysisData model
     """
-    progress_data = progress if isinstance(progress, dict) else progress.model_dump()
+    # Append results_summary to the model's JSON object
+    data = orjson.dumps(analysis_data)
     return create_event(
-        EventType.ANALYSIS_PROGRESS,
-        {
-            "analysis_id": analysis_id,
-            **progress_data
-        }
+        _EVT_COMPLETE,
+        orjson.Fragment(data[:-1] + b',"results_summary":' + orjson.dumps(results_summary) + b'}')
     )
 
 
-def analysis_complete_event(analysis_data: Dict | AnalysisData, results_summary: Dict) -> Dict:
+def vulnerability_detected_event(analysis_id: str, vulnerability: VulnerabilityData) -> bytes:
     """
-    Create an analysis complete event
+    Create a vulnerability detected event from a VulnerabilityData model
     """
-    data = analysis_data if isinstance(analysis_data, dict) else analysis_data.model_dump()
     return create_event(
-        EventType.ANALYSIS_COMPLETE,
+        _EVT_VULNERABILITY, 
         {
-            **data,
-            "results_summary": results_summary
+            "analysis_id": analysis_id,
+            "vulnerability": vulnerability
         }
     )
 
 
-def vulnerability_detected_event(analysis_id: str, vulnerability: Dict | VulnerabilityData) -> Dict:
+def vulnerability_event_from_dict(analysis_id: str, vulnerability: Dict) -> bytes:
     """
-    Create a vulnerability detected event
+    Create a vulnerability detected event from a vulnerability dict
     """
-    vuln_data = vulnerability if isinstance(vulnerability, dict) else vulnerability.model_dump()
     return create_event(
-        EventType.VULNERABILITY_DETECTED, 
+        _EVT_VULNERABILITY, 
         {
             "analysis_id": analysis_id,
-            "vulnerability": vuln_data
+            "vulnerability": vulnerability
         }
     )
 
 
-def analysis_error_event(analysis_id: str, error: str) -> Dict:
+# Fixed JSON scaffolding for the highest-volume events; only the field
+# values are encoded per event. Field order matches the factories above.
+_PROGRESS_PREFIX = b'{"event":' + orjson.dumps(_EVT_PROGRESS) + b',"data":{"analysis_id":'
+_VULNERABILITY_PREFIX = b'{"event":' + orjson.dumps(_EVT_VULNERABILITY) + b',"data":{"analysis_id":'
+_TIMESTAMP_KEY = b',"timestamp":'
+
+
+def progress_event(
+    analysis_id: str,
+    percent: float,
+    step: str,
+    details: Optional[str] = None
+) -> bytes:
+    """
+    Create a progress update event from its fields, skipping dict construction
+    """
+    dumps = orjson.dumps
+    return b"".join((
+        _PROGRESS_PREFIX, dumps(analysis_id),
+        b',"percent":', dumps(percent),
+        b',"step":', dumps(step),
+        b',"details":', dumps(details),
+        b'}', _TIMESTAMP_KEY, dumps(_now_iso()), b'}'
+    ))
+
+
+def vulnerability_event(
+    analysis_id: str,
+    vuln_type: str,
+    severity: str,
+    description: str,
+    file_name: str,
+    line_number: Optional[int] = None
+) -> bytes:
+    """
+    Create a vulnerability detected event from its fields, skipping dict construction
+    """
+    dumps = orjson.dumps
+    return b"".join((
+        _VULNERABILITY_PREFIX, dumps(analysis_id),
+        b',"vulnerability":{"type":', dumps(vuln_type),
+        b',"severity":', dumps(severity),
+        b',"description":', dumps(description),
+        b',"file_name":', dumps(file_name),
+        b',"line_number":', dumps(line_number),
+        b'}}', _TIMESTAMP_KEY, dumps(_now_iso()), b'}'
+    ))
+
+
+def analysis_error_event(analysis_id: str, error: str) -> bytes:
     """
     Create an analysis error event
     """
     return create_event(
-        EventType.ANALYSIS_ERROR,
+        _EVT_ERROR,
         {
             "analysis_id": analysis_id,
             "error": error
@@ -149,11 +258,11 @@ def analysis_error_event(analysis_id: str, error: str) -> Dict:
     )
 
 
-def batch_progress_event(batch_data: BatchData) -> Dict:
+def batch_progress_event(batch_data: BatchData) -> bytes:
     """
     Create a batch progress event
     """
     return create_event(
-        EventType.BATCH_PROGRESS,
-        batch_data.model_dump()
+        _EVT_BATCH_PROGRESS,
+        batch_data
     )
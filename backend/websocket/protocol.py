@@ -0,0 +1,66 @@
+"""
+uvicorn WebSocket protocol with permessage-deflate tuned for small JSON events.
+
+Event frames are small and repeat the same keys, so the compression
+context is kept across messages (context takeover) with a 4 KiB window,
+and messages too small to benefit are sent uncompressed.
+
+Pass the class to uvicorn.run(..., ws=DeflateWebSocketProtocol); the uvicorn
+command line only accepts its built-in protocol names.
+"""
+from uvicorn.protocols.websockets.websockets_impl import WebSocketProtocol
+from websockets import frames
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+
+# LZ77 window of 2**12 bytes; larger windows cost memory per connection
+# without helping messages this small
+SERVER_MAX_WINDOW_BITS = 12
+
+# Messages shorter than this are not worth compressing
+MIN_COMPRESS_SIZE = 256
+
+
+class SmallMessageDeflate(PerMessageDeflate):
+    """PerMessageDeflate that leaves short single-frame messages uncompressed."""
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        if (
+            frame.opcode in (frames.OP_TEXT, frames.OP_BINARY)
+            and frame.fin
+            and len(frame.data) < MIN_COMPRESS_SIZE
+        ):
+            # rsv1 stays unset, so the client reads the message as-is; the
+            # shared compression context is untouched
+            return frame
+        return super().encode(frame)
+
+
+class SmallMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """Server factory that negotiates like the stock one but returns SmallMessageDeflate."""
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, negotiated = super().process_request_params(params, accepted_extensions)
+        # Same negotiated settings, passed through the public constructor
+        extension = SmallMessageDeflate(
+            negotiated.remote_no_context_takeover,
+            negotiated.local_no_context_takeover,
+            negotiated.remote_max_window_bits,
+            negotiated.local_max_window_bits,
+            negotiated.compress_settings,
+        )
+        return response_params, extension
+
+
+class DeflateWebSocketProtocol(WebSocketProtocol):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.config.ws_per_message_deflate:
+            self.available_extensions = [
+                SmallMessageDeflateFactory(
+                    server_no_context_takeover=False,
+                    server_max_window_bits=SERVER_MAX_WINDOW_BITS,
+                )
+            ]
@@ -1,41 +1,84 @@
+"""
+WebSocket endpoints.
+
+These run on uvloop when it is installed (Linux/macOS): uvicorn's default
+"auto" loop picks it up. The loop has to be chosen by the server before it
+starts, so it is not installed from here.
+"""
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from uuid import UUID, uuid4
-from typing import Optional
+from uuid import uuid4
+import itertools
+import time
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+import orjson
+from jose import jwt
 
+from app.core.config import settings
 from .connection_manager import manager
 from .events import EventType, create_event
 
-# For authentication
+# For authentication; tokens are the ones the HTTP API issues, so they are
+# verified with the API's key and algorithm
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 # Create router
 router = APIRouter(tags=["websocket"])
 
+# Client ids only need to be unique within this process: a per-process
+# prefix plus a counter avoids drawing random bytes for every connection
+_PROCESS_PREFIX = uuid4().hex[:8]
+_client_counter = itertools.count()
+
+
+def new_client_id() -> str:
+    return f"{_PROCESS_PREFIX}-{next(_client_counter)}"
+
+
+@lru_cache(maxsize=4096)
+def _decode_token(token: str) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Verify a JWT once and return its (sub, exp); (None, None) if it is invalid
+    
+    Cached so reconnects with the same token skip signature verification;
+    a cached result can outlive the token, so get_current_user_id checks
+    exp on every use.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        return payload.get("sub"), payload.get("exp")
+    except Exception:
+        return None, None
+
 
 async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> Optional[str]:
     """
     Verify JWT token and extract user_id
     This is a simplified version - in production, implement proper JWT verification
     """
-    try:
-        from jose import jwt
-        from datetime import datetime
+    user_id, exp = _decode_token(token)
+    
+    # Check expiry on every use, including cache hits; tokens without an
+    # expiry are not accepted since a cached one would never lapse
+    if exp is None or time.time() >= exp:
+        return None
+        
+    return user_id
 
-        # In production, use proper secret key from environment variables
-        SECRET_KEY = "your-secret-key-here"
-        ALGORITHM = "HS256"
 
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        
-        # Check if token is expired
-        if payload.get("exp") and datetime.utcnow().timestamp() > payload.get("exp"):
-            return None
-            
-        return user_id
-    except Exception:
-        return None
+async def receive_json(websocket: WebSocket) -> Any:
+    """
+    Receive a message and parse it with orjson, from text or binary frames
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    raw = message.get("text")
+    if raw is None:
+        raw = message.get("bytes") or b""
+    return orjson.loads(raw)
 
 
 @router.websocket("/ws")
@@ -43,7 +86,7 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for anonymous connections
     """
-    client_id = uuid4()
+    client_id = new_client_id()
     await manager.connect(websocket, client_id)
     
     try:
@@ -51,14 +94,18 @@ async def websocket_endpoint(websocket: WebSocket):
         await manager.send_message(
             create_event(
                 EventType.CONNECTION_ESTABLISHED,
-                {"client_id": str(client_id), "authenticated": False}
+                {"client_id": client_id, "authenticated": False}
             ),
             client_id
         )
         
         # Handle incoming messages
         while True:
-            data = await websocket.receive_json()
+            try:
+                data = await receive_json(websocket)
+            except orjson.JSONDecodeError:
+                # Ignore malformed messages rather than dropping the connection
+                continue
             # Process incoming messages if needed
             # This is a simplified version, add message handling as required
     except WebSocketDisconnect:
@@ -74,7 +121,7 @@ async def websocket_authenticated(
     WebSocket endpoint for authenticated connections
     Authentication token is passed as a query parameter
     """
-    client_id = uuid4()
+    client_id = new_client_id()
     user_id = None
     
     # Verify token if provided
@@ -90,7 +137,7 @@ async def websocket_authenticated(
             create_event(
                 EventType.CONNECTION_ESTABLISHED,
                 {
-                    "client_id": str(client_id),
+                    "client_id": client_id,
                     "authenticated": user_id is not None,
                     "user_id": user_id if user_id else None
                 }
@@ -100,7 +147,11 @@ async def websocket_authenticated(
         
         # Handle incoming messages
         while True:
-            data = await websocket.receive_json()
+            try:
+                data = await receive_json(websocket)
+            except orjson.JSONDecodeError:
+                # Ignore malformed messages rather than dropping the connection
+                continue
             # Process authenticated messages
             # This is a simplified version, add message handling as required
     except WebSocketDisconnect:
@@ -199,26 +199,34 @@ class WebSocketService {
    */
   private handleMessage(event: MessageEvent): void {
     try {
-      const message = JSON.parse(event.data) as WebSocketEvent;
-      
-      // Handle connection established event specially
-      if (message.event === EventType.CONNECTION_ESTABLISHED) {
-        this.clientId = message.data.client_id;
-        this.authenticated = message.data.authenticated;
-        this.userId = message.data.user_id;
-        console.log(`WebSocket: Client ID ${this.clientId} established`);
-      }
-      
-      // Dispatch to all listeners for this event type
-      if (this.eventListeners.has(message.event)) {
-        const listeners = this.eventListeners.get(message.event) as EventCallback[];
-        listeners.forEach(callback => callback(message.data));
-      }
+      // The server coalesces events that queue up into a single array frame
+      const parsed = JSON.parse(event.data) as WebSocketEvent | WebSocketEvent[];
+      const messages = Array.isArray(parsed) ? parsed : [parsed];
+      messages.forEach(message => this.dispatchMessage(message));
     } catch (error) {
       console.error("WebSocket: Failed to parse message", error);
     }
   }
 
+  /**
+   * Dispatch a single event to its listeners
+   */
+  private dispatchMessage(message: WebSocketEvent): void {
+    // Handle connection established event specially
+    if (message.event === EventType.CONNECTION_ESTABLISHED) {
+      this.clientId = message.data.client_id;
+      this.authenticated = message.data.authenticated;
+      this.userId = message.data.user_id;
+      console.log(`WebSocket: Client ID ${this.clientId} established`);
+    }
+    
+    // Dispatch to all listeners for this event type
+    if (this.eventListeners.has(message.event)) {
+      const listeners = this.eventListeners.get(message.event) as EventCallback[];
+      listeners.forEach(callback => callback(message.data));
+    }
+  }
+
   /**
    * Attempt to reconnect WebSocket
    */
@@ -16,6 +16,8 @@ import sys
 import hashlib
 import json
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 # Directories
 INPUT_DIR = 'SmartContracts'
@@ -23,6 +25,18 @@ OUTPUT_DIR = 'Preprocessed_Contracts'
 EXTERNAL_DIR = 'External_Contracts'
 METADATA_FILE = os.path.join(OUTPUT_DIR, "metadata.json")
 
+# Files are hashed in chunks of this many bytes
+HASH_CHUNK_SIZE = 65536
+# Per-file preprocessing results, keyed by a hash of the source bytes
+PREPROCESS_CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache")
+# Bump when decoding/normalization/name extraction changes, so old cache entries are ignored
+PREPROCESS_CACHE_VERSION = 4
+
+# Whitespace at the end of a line (or of the file), for normalize_content
+TRAILING_WHITESPACE_RE = re.compile(r"[^\S\n]+(?=\n|\Z)")
+# Contract, library and interface declarations; group 1 is the name
+CONTRACT_NAME_RE = re.compile(r"^(?:abstract\s+)?(?:contract|library|interface)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*(?:is\s+[^\{]*)?\{", re.MULTILINE)
+
 def preprocess_training_data():
     """Process the initial training dataset of contracts"""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -36,10 +50,13 @@ def preprocess_training_data():
     for sol_path in sol_files:
         with open(sol_path, 'rb') as f:
             raw = f.read()
+            # A stable hash of the bytes, so the stored metadata is comparable across runs
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if content_hash in seen_hashes:
+                continue
             encoding = chardet.detect(raw)['encoding'] or 'utf-8'
             content = raw.decode(encoding, errors='ignore')
-            content_hash = hash(content)
-            if content_hash in seen_hashes or len(content.strip()) < 20:
+            if len(content.strip()) < 20:
                 continue
             seen_hashes.add(content_hash)
             out_path = os.path.join(OUTPUT_DIR, os.path.basename(sol_path))
@@ -75,8 +92,11 @@ def preprocess_external_contract(contract_path):
     try:
         with open(contract_path, 'rb') as f:
             raw = f.read()
-            encoding = chardet.detect(raw)['encoding'] or 'utf-8'
-            content = raw.decode(encoding, errors='ignore')
+            try:
+                content = raw.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                encoding = chardet.detect(raw)['encoding'] or 'utf-8'
+                content = raw.decode(encoding, errors='ignore')
             
             if len(content.strip()) < 20:
                 print(f"Warning: Contract {contract_path} seems too small or empty")
@@ -96,20 +116,111 @@ def get_file_hash(filepath):
     """Computes SHA256 hash of a file's content."""
     hasher = hashlib.sha256()
     with open(filepath, 'rb') as f:
-        buf = f.read()
-        hasher.update(buf)
+        # Hash in fixed-size chunks so memory use doesn't grow with file size
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
     return hasher.hexdigest()
 
 def normalize_content(content):
     """Basic normalization: strip trailing whitespace from lines, ensure consistent newlines."""
-    lines = content.splitlines()
-    normalized_lines = [line.rstrip() for line in lines]
-    return "\n".join(normalized_lines)
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    # Like joining the lines, drop a final line break
+    if content.endswith('\n'):
+        content = content[:-1]
+    return TRAILING_WHITESPACE_RE.sub('', content)
 
 def extract_contract_names(content):
     """Extracts contract, library, and interface names using regex."""
-    pattern = re.compile(r"^(?:abstract\s+)?(?:contract|library|interface)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*(?:is\s+[^\{]*)?\{", re.MULTILINE)
-    return pattern.findall(content)
+    return CONTRACT_NAME_RE.findall(content)
+
+
+def _preprocess_cache_path(content_hash):
+    """Cache file for a source's preprocessing result."""
+    return os.path.join(PREPROCESS_CACHE_DIR, f"{content_hash}.v{PREPROCESS_CACHE_VERSION}.json")
+
+def _read_cached_result(cache_path):
+    """Previously computed preprocessing result for a cache path, or None on a miss."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_cached_result(cache_path, result):
+    """Store a result for reuse; written to a temp file first so concurrent workers never read a partial file."""
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Failed to cache preprocessing result at {cache_path}: {e}")
+
+
+def _process_one(source_filepath):
+    """
+    Read, decode and normalize one contract file (runs in a worker process).
+    Returns a dict with the file's hash, normalized content and contract names,
+    or None if the file is skipped (the reason has already been printed).
+    Unchanged files are served from the preprocessing cache.
+    """
+    filename = os.path.basename(source_filepath)
+    try:
+        # Read content and detect encoding
+        with open(source_filepath, 'rb') as f_raw:
+            raw_data = f_raw.read()
+            if not raw_data:
+                print(f"Skipping empty file: {filename}")
+                return None
+            
+            # Hash the bytes as read: no re-encode pass, and identical files match even if encoding detection differs
+            content_hash = hashlib.sha256(raw_data).hexdigest()
+            cache_path = _preprocess_cache_path(content_hash)
+            cached = _read_cached_result(cache_path)
+            if cached is not None:
+                cached["filename"] = filename
+                return cached
+            
+            # Solidity sources are almost always UTF-8 (or plain ASCII), so encoding
+            # detection only runs for files that aren't; utf-8-sig also drops a BOM
+            try:
+                content = raw_data.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                detected_encoding = chardet.detect(raw_data)['encoding']
+                if detected_encoding:
+                    try:
+                        content = raw_data.decode(detected_encoding)
+                    except (UnicodeDecodeError, TypeError):
+                        print(f"Warning: Could not decode {filename} with detected encoding {detected_encoding}. Trying utf-8.")
+                        try:
+                            content = raw_data.decode('utf-8', errors='ignore') # Fallback
+                        except Exception as e_utf8:
+                            print(f"Error decoding {filename} with utf-8: {e_utf8}. Skipping.")
+                            return None
+                else: # If chardet fails, try utf-8
+                     print(f"Warning: Could not detect encoding for {filename}. Assuming utf-8.")
+                     try:
+                        content = raw_data.decode('utf-8', errors='ignore')
+                     except Exception as e_utf8_fallback:
+                        print(f"Error decoding {filename} with utf-8 fallback: {e_utf8_fallback}. Skipping.")
+                        return None
+
+        # Normalize
+        normalized_content = normalize_content(content)
+
+        result = {
+            "hash": content_hash,
+            "content": normalized_content,
+            # Extract basic metadata
+            "contract_names": extract_contract_names(normalized_content),
+        }
+        _write_cached_result(cache_path, result)
+        result["filename"] = filename
+        return result
+
+    except Exception as e:
+        print(f"Error processing {filename}: {e}")
+        return None
 
 
 def preprocess_contracts():
@@ -119,80 +230,63 @@ def preprocess_contracts():
 
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
+    os.makedirs(PREPROCESS_CACHE_DIR, exist_ok=True)
     # ... rest of the preprocess_contracts function ...
     processed_hashes = set()
     all_metadata = {}
-    file_count = 0
     duplicate_count = 0
     processed_count = 0
 
     print(f"Starting preprocessing from '{INPUT_DIR}'...")
 
-    for filename in os.listdir(INPUT_DIR):
-        if filename.endswith(".sol"): # Process only Solidity files
-            file_count += 1
-            source_filepath = os.path.join(INPUT_DIR, filename)
+    with os.scandir(INPUT_DIR) as entries:
+        source_entries = [(e.path, e.stat().st_size) for e in entries if e.name.endswith(".sol")] # Process only Solidity files
+    file_count = len(source_entries)
+
+    # Check for duplicates before any decoding work is spent on them. Only files
+    # sharing a size can be identical, so only those are hashed here; the first
+    # file in directory order is kept
+    size_counts = Counter(size for _, size in source_entries)
+    source_filepaths = []
+    for source_filepath, size in source_entries:
+        if size and size_counts[size] > 1:
+            content_hash = get_file_hash(source_filepath)
+            if content_hash in processed_hashes:
+                print(f"Skipping duplicate: {os.path.basename(source_filepath)}")
+                duplicate_count += 1
+                continue
+            processed_hashes.add(content_hash)
+        source_filepaths.append(source_filepath)
+
+    # Reading, decoding and normalizing are independent per file, so they run in worker processes
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for result in executor.map(_process_one, source_filepaths, chunksize=8):
+            if result is None:
+                continue
+            filename = result["filename"]
             dest_filepath = os.path.join(OUTPUT_DIR, filename)
+            content_hash = result["hash"]
+
+            normalized_content = result["content"]
+            if not normalized_content.strip():
+                print(f"Skipping file with no effective content after normalization: {filename}")
+                continue
 
             try:
-                # Read content and detect encoding
-                with open(source_filepath, 'rb') as f_raw:
-                    raw_data = f_raw.read()
-                    if not raw_data:
-                        print(f"Skipping empty file: {filename}")
-                        continue
-                    
-                    detected_encoding = chardet.detect(raw_data)['encoding']
-                    if detected_encoding:
-                        try:
-                            content = raw_data.decode(detected_encoding)
-                        except (UnicodeDecodeError, TypeError):
-                            print(f"Warning: Could not decode {filename} with detected encoding {detected_encoding}. Trying utf-8.")
-                            try:
-                                content = raw_data.decode('utf-8', errors='ignore') # Fallback
-                            except Exception as e_utf8:
-                                print(f"Error decoding {filename} with utf-8: {e_utf8}. Skipping.")
-                                continue
-                    else: # If chardet fails, try utf-8
-                         print(f"Warning: Could not detect encoding for {filename}. Assuming utf-8.")
-                         try:
-                            content = raw_data.decode('utf-8', errors='ignore')
-                         except Exception as e_utf8_fallback:
-                            print(f"Error decoding {filename} with utf-8 fallback: {e_utf8_fallback}. Skipping.")
-                            continue
-
-
-                # Check for duplicates
-                content_hash = hashlib.sha256(content.encode('utf-8', 'ignore')).hexdigest()
-                if content_hash in processed_hashes:
-                    print(f"Skipping duplicate: {filename}")
-                    duplicate_count += 1
-                    continue
-                processed_hashes.add(content_hash)
-
-                # Normalize
-                normalized_content = normalize_content(content)
-                if not normalized_content.strip():
-                    print(f"Skipping file with no effective content after normalization: {filename}")
-                    continue
-
-                # Extract basic metadata
-                contract_names = extract_contract_names(normalized_content)
-                
                 # Save processed file
                 with open(dest_filepath, 'w', encoding='utf-8') as f_out:
                     f_out.write(normalized_content)
-                
-                all_metadata[filename] = {
-                    "original_filename": filename,
-                    "processed_filepath": dest_filepath,
-                    "hash": content_hash,
-                    "contract_names_regex": contract_names, 
-                }
-                processed_count +=1
-
             except Exception as e:
                 print(f"Error processing {filename}: {e}")
+                continue
+            
+            all_metadata[filename] = {
+                "original_filename": filename,
+                "processed_filepath": dest_filepath,
+                "hash": content_hash,
+                "contract_names_regex": result["contract_names"], 
+            }
+            processed_count +=1
 
     # Save metadata
     with open(METADATA_FILE, 'w', encoding='utf-8') as f_meta:
@@ -205,13 +299,18 @@ def preprocess_contracts():
     print(f"Metadata saved to '{METADATA_FILE}'")
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
     parser = argparse.ArgumentParser(description='Preprocess smart contracts for loophole detection')
     parser.add_argument('--external', type=str, help='Path to external contract to preprocess')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.external:
         preprocess_external_contract(args.external)
     else:
-        preprocess_contracts()
\ No newline at end of file
+        preprocess_contracts()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,25 +5,127 @@ This is the main entry point for analyzing new contracts.
 """
 import os
 import sys
-import subprocess
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+# Pipeline stages run in this process, so the interpreter and their
+# libraries are loaded once rather than once per stage
+import data_preprocessing
+import feature_extraction
+import loophole_detection
+import train_model
+import generate_report
+
+def _has_entries(path):
+    """True if the directory exists and is not empty; stops at the first entry."""
+    try:
+        with os.scandir(path) as it:
+            return next(it, None) is not None
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+def unique_contract_paths(contract_paths):
+    """
+    Drop repeated paths and exit if two contracts share a name; every stage
+    names its outputs after the contract, so such runs would overwrite each other.
+    """
+    by_real_path = {}
+    for path in contract_paths:
+        by_real_path.setdefault(os.path.realpath(path), path)
+    unique = list(by_real_path.values())
+    seen = {}
+    for path in unique:
+        contract_name = os.path.splitext(os.path.basename(path))[0]
+        if contract_name in seen:
+            print(f"Error: {seen[contract_name]} and {path} would write the same output files; evaluate them separately.")
+            sys.exit(1)
+        seen[contract_name] = path
+    return unique
+
+def run_stage(stage_main, argv=None):
+    """Run a pipeline stage's main(); like a separate process, a failing stage doesn't stop the pipeline."""
+    try:
+        if argv is None:
+            stage_main()
+        else:
+            stage_main(argv)
+    except SystemExit:
+        pass
+    except Exception as e:
+        print(f"Error in {stage_main.__module__}: {e}")
+
+def evaluate_one(contract_path):
+    """Run the evaluation stages for one contract; returns the expected report path."""
+    print(f"\nEvaluating external contract: {contract_path}")
+    
+    # Step 1: Preprocess the contract
+    print("Step 1: Preprocessing contract...")
+    run_stage(data_preprocessing.main, ['--external', contract_path])
+    
+    # Step 2: Extract features
+    print("Step 2: Extracting features...")
+    run_stage(feature_extraction.main, ['--contract', contract_path])
+    
+    # Step 3: Detect loopholes
+    print("Step 3: Detecting loopholes...")
+    run_stage(loophole_detection.main, ['--contract', contract_path])
+    
+    # Step 4: Generate report
+    print("Step 4: Generating report...")
+    run_stage(generate_report.main, ['--contract', contract_path])
+    
+    # Get the report filename
+    contract_name = os.path.splitext(os.path.basename(contract_path))[0]
+    return os.path.join('External_Results', 'reports', f"{contract_name}_report.md")
+
+def print_report_summary(report_path):
+    """Print where a report was written and its summary section."""
+    if os.path.exists(report_path):
+        print(f"\nEvaluation complete! Report generated at: {report_path}")
+        
+        # Show a summary of the findings
+        try:
+            # Find and print the summary section, reading only as far as its end
+            print("\nSummary of findings:")
+            with open(report_path, 'r', buffering=65536) as f:
+                summary_start = False
+                for line in f:
+                    if "## Summary" in line:
+                        summary_start = True
+                        continue
+                    
+                    if summary_start and line.strip() == "":
+                        continue
+                        
+                    if summary_start and line.startswith("##"):
+                        break
+                        
+                    if summary_start:
+                        print(line.strip())
+        except Exception as e:
+            print(f"Error reading report: {e}")
+    else:
+        print(f"Evaluation complete, but report file was not found at expected location: {report_path}")
 
 def main():
     parser = argparse.ArgumentParser(description='Evaluate external smart contracts for loopholes')
-    parser.add_argument('contract_path', type=str, help='Path to the smart contract file (.sol)')
+    parser.add_argument('contract_paths', type=str, nargs='+', metavar='contract_path', help='Path to a smart contract file (.sol)')
     parser.add_argument('--skip-training', action='store_true', help='Skip training phase and use existing model')
     
     args = parser.parse_args()
     
-    if not os.path.exists(args.contract_path):
-        print(f"Error: Contract file not found: {args.contract_path}")
-        sys.exit(1)
+    for contract_path in args.contract_paths:
+        if not os.path.exists(contract_path):
+            print(f"Error: Contract file not found: {contract_path}")
+            sys.exit(1)
+        
+        if not contract_path.endswith('.sol'):
+            print(f"Warning: File {contract_path} does not have a .sol extension. Is this a Solidity file?")
+            response = input("Continue anyway? (y/n): ")
+            if response.lower() != 'y':
+                sys.exit(0)
     
-    if not args.contract_path.endswith('.sol'):
-        print(f"Warning: File {args.contract_path} does not have a .sol extension. Is this a Solidity file?")
-        response = input("Continue anyway? (y/n): ")
-        if response.lower() != 'y':
-            sys.exit(0)
+    contract_paths = unique_contract_paths(args.contract_paths)
     
     # Create necessary directories
     os.makedirs('External_Contracts', exist_ok=True)
@@ -37,74 +139,35 @@ def main():
         print("Running training pipeline to build vulnerability model...")
         
         # Check if we have training data
-        if not os.path.exists('Preprocessed_Contracts') or len(os.listdir('Preprocessed_Contracts')) == 0:
+        if not _has_entries('Preprocessed_Contracts'):
             print("No training data found. Running preprocessing...")
-            subprocess.run(['python', 'data_preprocessing.py'])
+            run_stage(data_preprocessing.main, [])
         
         # Extract features and detect loopholes if needed
-        if not os.path.exists('Detection_Results') or len(os.listdir('Detection_Results')) == 0:
-            if not os.path.exists('Extracted_Features') or len(os.listdir('Extracted_Features')) == 0:
+        if not _has_entries('Detection_Results'):
+            if not _has_entries('Extracted_Features'):
                 print("Extracting features from training contracts...")
-                subprocess.run(['python', 'feature_extraction.py'])
+                run_stage(feature_extraction.main, [])
             
             print("Detecting loopholes in training contracts...")
-            subprocess.run(['python', 'loophole_detection.py'])
+            run_stage(loophole_detection.main, [])
         
         # Train model
         print("Training vulnerability model...")
-        subprocess.run(['python', 'train_model.py'])
-    
-    # Process the external contract
-    print(f"\nEvaluating external contract: {args.contract_path}")
-    
-    # Step 1: Preprocess the contract
-    print("Step 1: Preprocessing contract...")
-    subprocess.run(['python', 'data_preprocessing.py', '--external', args.contract_path])
-    
-    # Step 2: Extract features
-    print("Step 2: Extracting features...")
-    subprocess.run(['python', 'feature_extraction.py', '--contract', args.contract_path])
-    
-    # Step 3: Detect loopholes
-    print("Step 3: Detecting loopholes...")
-    subprocess.run(['python', 'loophole_detection.py', '--contract', args.contract_path])
-    
-    # Step 4: Generate report
-    print("Step 4: Generating report...")
-    subprocess.run(['python', 'generate_report.py', '--contract', args.contract_path])
+        run_stage(train_model.main)
     
-    # Get the report filename
-    contract_name = os.path.splitext(os.path.basename(args.contract_path))[0]
-    report_path = os.path.join('External_Results', 'reports', f"{contract_name}_report.md")
-    
-    if os.path.exists(report_path):
-        print(f"\nEvaluation complete! Report generated at: {report_path}")
-        
-        # Show a summary of the findings
-        try:
-            with open(report_path, 'r') as f:
-                lines = f.readlines()
-                
-            # Find and print the summary section
-            print("\nSummary of findings:")
-            summary_start = False
-            for line in lines:
-                if "## Summary" in line:
-                    summary_start = True
-                    continue
-                
-                if summary_start and line.strip() == "":
-                    continue
-                    
-                if summary_start and line.startswith("##"):
-                    break
-                    
-                if summary_start:
-                    print(line.strip())
-        except Exception as e:
-            print(f"Error reading report: {e}")
+    # Contracts are independent of each other (each stage writes files
+    # named after its contract, and names are unique), so several are
+    # evaluated in parallel
+    if len(contract_paths) == 1:
+        report_paths = [evaluate_one(contract_paths[0])]
     else:
-        print(f"Evaluation complete, but report file was not found at expected location: {report_path}")
+        workers = min(len(contract_paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            report_paths = list(pool.map(evaluate_one, contract_paths))
+    
+    for report_path in report_paths:
+        print_report_summary(report_path)
 
 if __name__ == "__main__":
     main()
@@ -2,15 +2,48 @@
 import os
 import json
 import sys
-import subprocess # For the initial solc-select check
 import argparse
-from glob import glob
+from dataclasses import dataclass
+import hashlib
+import operator
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib import metadata
+
+try:
+    import orjson # Optional: much faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
+try:
+    import ijson # Optional: streams metadata entries instead of loading the whole file
+except ImportError:
+    ijson = None
+
+# Imported once here rather than per file; main() reports a missing install
+try:
+    from slither import Slither
+    from slither.exceptions import SlitherError # To catch Slither-specific compilation issues
+    # from slither.core.declarations.modifier import Modifier # For isinstance check, if needed
+    _SLITHER_AVAILABLE = True
+except ImportError:
+    Slither = None
+    class SlitherError(Exception): # Placeholder so the except clauses below stay valid
+        pass
+    _SLITHER_AVAILABLE = False
 
 PREPROCESSED_DIR = "Preprocessed_Contracts"
 FEATURES_DIR = "Extracted_Features"
 EXTERNAL_DIR = "External_Contracts"
 EXTERNAL_FEATURES_DIR = os.path.join("External_Results", "features")
 METADATA_FILE = os.path.join(PREPROCESSED_DIR, "metadata.json")
+# Features of already-seen sources, reused for identical files
+FEATURES_CACHE_DIR = os.path.join(FEATURES_DIR, ".cache")
+# Sources are hashed for the cache in chunks of this many bytes
+HASH_CHUNK_SIZE = 65536
+# Bump when the extracted feature format changes, so old cache entries are ignored
+FEATURES_SCHEMA_VERSION = 1
 
 # --- Configuration ---
 # Define the Solidity compiler version to be used by Slither's Python API.
@@ -19,204 +52,365 @@ METADATA_FILE = os.path.join(PREPROCESSED_DIR, "metadata.json")
 # Ensure this version is installed via `solc-select install <version>`
 SOLC_VERSION_FOR_SLITHER_API = "0.4.24"  # <<< IMPORTANT: SET THIS TO YOUR REQUIRED SOLC VERSION
 
-def extract_all_features():
-    if not os.path.exists(PREPROCESSED_DIR):
-        print(f"Error: Preprocessed directory '{os.path.abspath(PREPROCESSED_DIR)}' not found.")
-        sys.exit(1)
-
-    if not os.path.exists(METADATA_FILE):
-        print(f"Error: Metadata file '{os.path.abspath(METADATA_FILE)}' not found. Run preprocessing first.")
-        sys.exit(1)
-
-    if not os.path.exists(FEATURES_DIR):
-        os.makedirs(FEATURES_DIR)
-
+def _resolve_solc_binary(version):
+    """Absolute path of the solc-select installed compiler for version, or None if it can't be found."""
     try:
-        with open(METADATA_FILE, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: Metadata file '{METADATA_FILE}' not found. Ensure preprocessing ran successfully.")
-        sys.exit(1)
-    except json.JSONDecodeError:
-        print(f"Error: Metadata file '{METADATA_FILE}' is corrupted or not valid JSON.")
-        sys.exit(1)
+        from solc_select.constants import ARTIFACTS_DIR
+    except ImportError:
+        return None
+    solc_path = os.path.join(ARTIFACTS_DIR, f"solc-{version}", f"solc-{version}")
+    return solc_path if os.path.isfile(solc_path) else None
 
+# Resolved once so each Slither() call runs the binary directly instead of going through solc-select
+SOLC_BINARY = _resolve_solc_binary(SOLC_VERSION_FOR_SLITHER_API)
+# Compiler arguments for Slither(): the resolved binary, or solc-select by version as a fallback
+SLITHER_SOLC_ARGS = {"solc": SOLC_BINARY} if SOLC_BINARY else {"solc_solcs_select": SOLC_VERSION_FOR_SLITHER_API}
 
-    print(f"Starting feature extraction from '{PREPROCESSED_DIR}'...")
-    print(f"Attempting to use SOLC version via solc-select for Slither API: {SOLC_VERSION_FOR_SLITHER_API}")
-
-    # --- Optional: Attempt to set solc-select version for the environment ---
-    # This is a best-effort attempt; `solc_solcs_select` in Slither() is more direct.
+def _slither_version():
+    """Installed slither-analyzer version, or "unknown" if it isn't installed."""
     try:
-        # This command tries to make solc-select switch the active 'solc' symlink/shim.
-        # Slither might then pick this up if it just calls 'solc'.
-        subprocess.run(["solc-select", "use", SOLC_VERSION_FOR_SLITHER_API], check=True, capture_output=True, text=True)
-        print(f"  Successfully ran 'solc-select use {SOLC_VERSION_FOR_SLITHER_API}'. Slither might use this context.")
-    except FileNotFoundError:
-        print(f"  Warning: 'solc-select' command not found. Ensure it's installed and in PATH if relying on it globally.")
-    except subprocess.CalledProcessError as e:
-        print(f"  Warning: 'solc-select use {SOLC_VERSION_FOR_SLITHER_API}' failed. Error: {e.stderr.strip()}")
-        print(f"  Ensure solc version {SOLC_VERSION_FOR_SLITHER_API} is installed via 'solc-select install {SOLC_VERSION_FOR_SLITHER_API}'.")
-        print(f"  Slither will rely on 'solc_solcs_select' parameter or its default compiler finding logic.")
-    # --- End Optional solc-select check ---
-
-    successful_extractions = 0
-    files_with_no_features = 0
-    failed_extractions = 0
-
-    for contract_filename_key, meta_info in metadata.items():
-        processed_filepath = meta_info.get("processed_filepath")
-        if not processed_filepath or not os.path.exists(processed_filepath):
-            print(f"Skipping {contract_filename_key}: processed file path '{processed_filepath}' not found or invalid in metadata.")
-            failed_extractions += 1
-            # Create an error JSON for this file
-            error_features = {"error": "Processed file path not found in metadata or file does not exist.", "contract_file": contract_filename_key}
-            error_feature_filename = f"{os.path.splitext(contract_filename_key)[0]}_features.json" # Save as .json to be consistent
-            error_feature_filepath = os.path.join(FEATURES_DIR, error_feature_filename)
+        return metadata.version("slither-analyzer")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+# Everything besides the source that determines extracted features; part of the cache key
+FEATURES_CACHE_SALT = (
+    f"solc={SOLC_VERSION_FOR_SLITHER_API};slither={_slither_version()};schema={FEATURES_SCHEMA_VERSION}"
+).encode()
+
+def _loads(data):
+    """Parse JSON with orjson when available, else the stdlib json module."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj, pretty=False):
+    """UTF-8 JSON bytes for a feature file, using orjson when available; compact unless pretty is set."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=4).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def _write_json(filepath, obj):
+    """Serialize obj fully before opening filepath, then write it in a single call."""
+    payload = _dumps(obj)
+    with open(filepath, 'wb') as f:
+        f.write(payload)
+
+_name = operator.attrgetter('name')
+
+class _FeatureWriter:
+    """Writes serialized feature files on a background thread so extraction doesn't wait on disk."""
+
+    def __init__(self, maxsize=32):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.failed_writes = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            filepath, payload = item
             try:
-                with open(error_feature_filepath, 'w', encoding='utf-8') as f_err:
-                    json.dump(error_features, f_err, indent=4)
-                print(f"  Error report for {contract_filename_key} saved to {error_feature_filepath}")
+                with open(filepath, 'wb') as f:
+                    f.write(payload)
             except Exception as e_write:
-                 print(f"  CRITICAL: Failed to write error report {error_feature_filepath}: {e_write}")
-            continue
+                print(f"  CRITICAL: Failed to write feature file {filepath}: {e_write}")
+                self.failed_writes += 1
+
+    def put(self, filepath, payload):
+        """Queue serialized JSON bytes to be written to filepath."""
+        self._queue.put((filepath, payload))
+
+    def close(self):
+        """Wait until every queued file has been written."""
+        self._queue.put(None)
+        self._thread.join()
+
+def _fmt_param(v):
+    """"<type> <name>" for a parameter."""
+    return f"{v.type} {v.name}"
+
+def _fmt_return(v):
+    """"<type> <name>" for a return value; the name is often empty."""
+    return f"{v.type} {v.name or ''}"
+
+def _build_func_record(func_or_modifier_obj, declared_modifier_names):
+    """Feature dict for one function or modifier of a contract."""
+    # Determine if this object represents a declared modifier: newer Slither versions
+    # have func_obj.is_modifier; fall back to the names declared in this contract
+    is_declared_modifier = getattr(func_or_modifier_obj, 'is_modifier', False) or func_or_modifier_obj.name in declared_modifier_names
+
+    return {
+        "name": func_or_modifier_obj.full_name, # e.g., "MyContract.myFunction" or "MyContract.myModifier"
+        "signature": func_or_modifier_obj.signature_str, # e.g., "myFunction(uint256)"
+        "visibility": func_or_modifier_obj.visibility,
+        "is_constructor": func_or_modifier_obj.is_constructor,
+        "is_declared_modifier": is_declared_modifier, # True if this object itself is a modifier declaration
+        # Modifiers *applied to* (used by) this function/constructor/modifier
+        # func_or_modifier_obj.modifiers should list ModifierSolidity objects (or similar) that are applied
+        "applied_modifiers": list(map(_name, func_or_modifier_obj.modifiers)),
+        "is_payable": func_or_modifier_obj.payable,
+        "is_view": func_or_modifier_obj.view, # Slither maps 'constant' to 'view' for 0.4.x
+        "is_pure": func_or_modifier_obj.pure,
+        "parameters": list(map(_fmt_param, func_or_modifier_obj.parameters)),
+        "return_values": list(map(_fmt_return, func_or_modifier_obj.return_values)),
+        # "node_entry_point_id": func_or_modifier_obj.entry_point.node_id if func_or_modifier_obj.entry_point else None, # Example for CFG
+    }
+
+def _serialize_contract(contract_obj):
+    """Feature dict for one Slither contract object; shared by the training and external paths."""
+    # Get a set of modifier names declared in this specific contract object for efficient lookup
+    # contract_obj.modifiers should list ModifierDeclaration instances
+    declared_modifier_names = set(map(_name, contract_obj.modifiers))
+
+    functions_and_modifiers_info = [
+        _build_func_record(func_or_modifier_obj, declared_modifier_names)
+        for func_or_modifier_obj in contract_obj.functions_and_modifiers
+    ]
+
+    state_vars_info = [
+        {
+            "name": var_obj.name,
+            "type": str(var_obj.type),
+            "visibility": var_obj.visibility,
+            "is_constant": var_obj.is_constant,
+            "is_immutable": var_obj.is_immutable,
+            # "initial_value_expression": str(var_obj.expression) if var_obj.expression else None,
+        }
+        for var_obj in contract_obj.state_variables
+    ]
+
+    return {
+        "contract_name_in_file": contract_obj.name,
+        "kind": contract_obj.contract_kind,
+        "inheritance": list(map(_name, contract_obj.inheritance)),
+        "is_fully_implemented": contract_obj.is_fully_implemented,
+        "defined_functions_and_modifiers": functions_and_modifiers_info,
+        "defined_state_variables": state_vars_info,
+        # "defined_events": [{ "name": e.name, "signature": e.full_name } for e in contract_obj.events],
+        # "defined_structs": [s.name for s in contract_obj.structs_as_dict.values()], # or contract_obj.structs
+        # "defined_enums": [e.name for e in contract_obj.enums_as_dict.values()], # or contract_obj.enums
+    }
+
+def _feature_cache_path(processed_filepath):
+    """Cache file for a source's features, keyed by a hash of FEATURES_CACHE_SALT and the source bytes."""
+    hasher = hashlib.blake2b(FEATURES_CACHE_SALT, digest_size=16)
+    with open(processed_filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return os.path.join(FEATURES_CACHE_DIR, f"{hasher.hexdigest()}.json")
+
+def _read_cached_features(cache_path):
+    """Previously extracted features for a cache path, or None on a miss."""
+    try:
+        with open(cache_path, 'rb') as f:
+            return _loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_cached_features(cache_path, features):
+    """Store features for reuse; written to a temp file first so concurrent workers never read a partial file."""
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        _write_json(temp_path, features)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"  Warning: Failed to cache features at {cache_path}: {e}")
+
+@dataclass
+class ExtractionStats:
+    """Per-file outcome counts; workers return one and the parent adds them up."""
+    ok: int = 0      # files with extracted contract features
+    empty: int = 0   # files where Slither found no contract objects
+    failed: int = 0  # files with errors, missing paths or output failures
+
+    def add(self, other):
+        self.ok += other.ok
+        self.empty += other.empty
+        self.failed += other.failed
+
+def _process_one(contract_filename_key, meta_info, source_exists=True, pretty=False):
+    """
+    Extract features for one metadata entry.
+    Returns (key, ExtractionStats, (feature_filepath, serialized JSON)); the caller writes the file.
+    """
+    stats = ExtractionStats()
+    # Output path for this .sol file's features (or error/info report)
+    feature_filepath = os.path.join(FEATURES_DIR, f"{os.path.splitext(contract_filename_key)[0]}_features.json")
+
+    processed_filepath = meta_info.get("processed_filepath")
+    # source_exists comes from the caller's single scan of PREPROCESSED_DIR
+    if not processed_filepath or not source_exists:
+        print(f"Skipping {contract_filename_key}: processed file path '{processed_filepath}' not found or invalid in metadata.")
+        stats.failed += 1
+        # Create an error JSON for this file
+        error_features = {"error": "Processed file path not found in metadata or file does not exist.", "contract_file": contract_filename_key}
+        print(f"  Error report for {contract_filename_key} saved to {feature_filepath}")
+        return contract_filename_key, stats, (feature_filepath, _dumps(error_features, pretty))
+
+    print(f"Processing {processed_filepath}...")
+    contract_features_for_file = {} # Stores features for all contracts within this one .sol file
 
-        print(f"Processing {processed_filepath}...")
-        contract_features_for_file = {} # Stores features for all contracts within this one .sol file
+    try:
+        if not _SLITHER_AVAILABLE:
+            raise ImportError("slither")
 
-        try:
-            from slither import Slither
-            from slither.exceptions import SlitherError # To catch Slither-specific compilation issues
-            # from slither.core.declarations.modifier import Modifier # For isinstance check, if needed
+        # Identical sources give identical features, so reuse the result of an earlier file
+        cache_path = _feature_cache_path(processed_filepath)
+        cached_features = _read_cached_features(cache_path)
 
+        if cached_features is not None:
+            print(f"  Reusing features extracted from an identical source for {contract_filename_key}")
+            contract_features_for_file = cached_features
+            stats.ok += 1
+        else:
             slither_instance = Slither(
                 processed_filepath,
-                solc_solcs_select=SOLC_VERSION_FOR_SLITHER_API,
-                disable_fail_on_error=True
+                disable_fail_on_error=True,
+                **SLITHER_SOLC_ARGS
             )
 
             if not slither_instance.contracts:
                 print(f"    Warning: Slither API found no contract objects in '{contract_filename_key}'. This could be due to compilation errors (check Slither logs/stderr if persistent), an empty file, or an interface-only file.")
-                files_with_no_features += 1
+                stats.empty += 1
                 # Save an empty JSON or a note indicating no contracts found
                 contract_features_for_file = {"info": "No contract objects found by Slither.", "contract_file": contract_filename_key}
             else:
                 for contract_obj in slither_instance.contracts:
-                    # Get a set of modifier names declared in this specific contract object for efficient lookup
-                    # contract_obj.modifiers should list ModifierDeclaration instances
-                    declared_modifier_names = {m.name for m in contract_obj.modifiers}
-
-                    functions_and_modifiers_info = []
-                    for func_or_modifier_obj in contract_obj.functions_and_modifiers:
-                        # Determine if this object represents a declared modifier
-                        is_declared_modifier = False
-                        if hasattr(func_or_modifier_obj, 'is_modifier') and func_or_modifier_obj.is_modifier:
-                            # Newer Slither versions might have func_obj.is_modifier
-                            is_declared_modifier = True
-                        elif func_or_modifier_obj.name in declared_modifier_names:
-                            # Fallback: if its name is in the list of declared modifiers for this contract
-                            is_declared_modifier = True
-                        # You could also add:
-                        # elif isinstance(func_or_modifier_obj, Modifier): # If Modifier class is imported
-                        #    is_declared_modifier = True
-
-
-                        # Get modifiers *applied to* this function/modifier
-                        # func_or_modifier_obj.modifiers should list ModifierSolidity objects (or similar) that are applied
-                        applied_modifiers_names = [m.name for m in func_or_modifier_obj.modifiers]
-
-                        functions_and_modifiers_info.append({
-                            "name": func_or_modifier_obj.full_name, # e.g., "MyContract.myFunction" or "MyContract.myModifier"
-                            "signature": func_or_modifier_obj.signature_str, # e.g., "myFunction(uint256)"
-                            "visibility": func_or_modifier_obj.visibility,
-                            "is_constructor": func_or_modifier_obj.is_constructor,
-                            "is_declared_modifier": is_declared_modifier, # True if this object itself is a modifier declaration
-                            "applied_modifiers": applied_modifiers_names, # Modifiers *used by* this function/constructor/modifier
-                            "is_payable": func_or_modifier_obj.payable,
-                            "is_view": func_or_modifier_obj.view, # Slither maps 'constant' to 'view' for 0.4.x
-                            "is_pure": func_or_modifier_obj.pure,
-                            "parameters": [f"{str(v.type)} {v.name}" for v in func_or_modifier_obj.parameters],
-                            "return_values": [f"{str(v.type)} {v.name if v.name else ''}" for v in func_or_modifier_obj.return_values],
-                            # "node_entry_point_id": func_or_modifier_obj.entry_point.node_id if func_or_modifier_obj.entry_point else None, # Example for CFG
-                        })
-
-                    state_vars_info = []
-                    for var_obj in contract_obj.state_variables:
-                        state_vars_info.append({
-                            "name": var_obj.name,
-                            "type": str(var_obj.type),
-                            "visibility": var_obj.visibility,
-                            "is_constant": var_obj.is_constant,
-                            "is_immutable": var_obj.is_immutable,
-                            # "initial_value_expression": str(var_obj.expression) if var_obj.expression else None,
-                        })
-
                     # Store features for this specific contract object within the file
-                    contract_features_for_file[contract_obj.name] = {
-                        "contract_name_in_file": contract_obj.name,
-                        "kind": contract_obj.contract_kind,
-                        "inheritance": [c.name for c in contract_obj.inheritance],
-                        "is_fully_implemented": contract_obj.is_fully_implemented,
-                        "defined_functions_and_modifiers": functions_and_modifiers_info,
-                        "defined_state_variables": state_vars_info,
-                        # "defined_events": [{ "name": e.name, "signature": e.full_name } for e in contract_obj.events],
-                        # "defined_structs": [s.name for s in contract_obj.structs_as_dict.values()], # or contract_obj.structs
-                        # "defined_enums": [e.name for e in contract_obj.enums_as_dict.values()], # or contract_obj.enums
-                    }
+                    contract_features_for_file[contract_obj.name] = _serialize_contract(contract_obj)
 
                 if contract_features_for_file: # If any contract features were extracted from this file
-                    successful_extractions += 1
+                    stats.ok += 1
+                    _write_cached_features(cache_path, contract_features_for_file)
                 else: # Should only happen if slither_instance.contracts was empty initially
-                      # This case is already handled by the "files_with_no_features" counter
+                      # This case is already handled by the stats.empty counter
                     pass
 
 
-        except ImportError:
-            print(f"CRITICAL: Slither Python API not found for {contract_filename_key}. Ensure 'slither-analyzer' is installed correctly in the venv.")
-            # This is a fatal error for the script; metadata for this file will be an error.
-            contract_features_for_file = {"error": "Slither API ImportError", "contract_file": contract_filename_key}
-            failed_extractions += 1 # Count as explicit failure to attempt processing
-            # To prevent loop from continuing if Slither itself is missing, we can exit:
-            # sys.exit(1) # Or handle more gracefully by skipping all subsequent files.
-            # For now, we'll let it record the error for this file and try others.
-        except SlitherError as se:
-            print(f"  SlitherError during feature extraction for {contract_filename_key}: {se}")
-            contract_features_for_file = {"error": f"SlitherError: {str(se)}", "contract_file": contract_filename_key}
-            failed_extractions += 1
-        except Exception as e:
-            print(f"  General Error during feature extraction for {contract_filename_key}: {type(e).__name__} - {e}")
-            contract_features_for_file = {"error": f"General Error: {type(e).__name__} - {str(e)}", "contract_file": contract_filename_key}
-            failed_extractions += 1
-
-        # Save the extracted features (or error/info) for this .sol file
-        feature_filename = f"{os.path.splitext(contract_filename_key)[0]}_features.json"
-        feature_filepath = os.path.join(FEATURES_DIR, feature_filename)
-        try:
-            with open(feature_filepath, 'w', encoding='utf-8') as f_feat:
-                json.dump(contract_features_for_file, f_feat, indent=4)
+    except ImportError:
+        print(f"CRITICAL: Slither Python API not found for {contract_filename_key}. Ensure 'slither-analyzer' is installed correctly in the venv.")
+        # This is a fatal error for the script; metadata for this file will be an error.
+        contract_features_for_file = {"error": "Slither API ImportError", "contract_file": contract_filename_key}
+        stats.failed += 1 # Count as explicit failure to attempt processing
+        # To prevent loop from continuing if Slither itself is missing, we can exit:
+        # sys.exit(1) # Or handle more gracefully by skipping all subsequent files.
+        # For now, we'll let it record the error for this file and try others.
+    except SlitherError as se:
+        print(f"  SlitherError during feature extraction for {contract_filename_key}: {se}")
+        contract_features_for_file = {"error": f"SlitherError: {str(se)}", "contract_file": contract_filename_key}
+        stats.failed += 1
+    except FileNotFoundError:
+        print(f"Skipping {contract_filename_key}: processed file path '{processed_filepath}' not found or invalid in metadata.")
+        contract_features_for_file = {"error": "Processed file path not found in metadata or file does not exist.", "contract_file": contract_filename_key}
+        stats.failed += 1
+    except Exception as e:
+        print(f"  General Error during feature extraction for {contract_filename_key}: {type(e).__name__} - {e}")
+        contract_features_for_file = {"error": f"General Error: {type(e).__name__} - {str(e)}", "contract_file": contract_filename_key}
+        stats.failed += 1
+
+    # Serialize the extracted features (or error/info) for this .sol file
+    payload = None
+    try:
+        payload = _dumps(contract_features_for_file, pretty)
 
-            if "error" not in contract_features_for_file and "info" not in contract_features_for_file and contract_features_for_file:
-                print(f"  Extracted features saved to {feature_filepath}")
-            elif "error" in contract_features_for_file:
-                print(f"  Error details for {contract_filename_key} saved to {feature_filepath}")
-            elif "info" in contract_features_for_file:
-                print(f"  Info (e.g., no contracts found) for {contract_filename_key} saved to {feature_filepath}")
-            # else: # contract_features_for_file might be empty if a file had contracts but none had extractable elements (unlikely)
-            #    print(f"  No specific features extracted though contracts might exist; empty map saved to {feature_filepath}")
+        if "error" not in contract_features_for_file and "info" not in contract_features_for_file and contract_features_for_file:
+            print(f"  Extracted features saved to {feature_filepath}")
+        elif "error" in contract_features_for_file:
+            print(f"  Error details for {contract_filename_key} saved to {feature_filepath}")
+        elif "info" in contract_features_for_file:
+            print(f"  Info (e.g., no contracts found) for {contract_filename_key} saved to {feature_filepath}")
+        # else: # contract_features_for_file might be empty if a file had contracts but none had extractable elements (unlikely)
+        #    print(f"  No specific features extracted though contracts might exist; empty map saved to {feature_filepath}")
+
+    except Exception as e_write:
+        print(f"  CRITICAL: Failed to serialize feature file {feature_filepath}: {e_write}")
+        stats.failed += 1 # Count as an additional failure if the output can't be produced
+
+    return contract_filename_key, stats, (feature_filepath, payload)
+
+
+def _iter_metadata(f):
+    """Yield (contract_filename_key, meta_info) pairs from the metadata file, streaming them when ijson is installed."""
+    if ijson is not None:
+        return ijson.kvitems(f, '', use_float=True)
+    return _loads(f.read()).items()
+
+def _list_sources(directory):
+    """Paths of the files in directory, from one directory scan."""
+    try:
+        with os.scandir(directory) as entries:
+            return {e.path for e in entries if e.is_file()}
+    except FileNotFoundError:
+        return set()
+
+def _source_exists(processed_filepath, existing_sources):
+    """Whether a metadata entry's file exists; only paths outside the scanned directory are stat'ed."""
+    if not processed_filepath:
+        return False
+    return processed_filepath in existing_sources or os.path.isfile(processed_filepath)
+
+def extract_all_features(pretty=False):
+    # JSON errors from whichever parser reads the metadata
+    metadata_errors = (json.JSONDecodeError, ijson.JSONError) if ijson is not None else json.JSONDecodeError
+
+    os.makedirs(FEATURES_CACHE_DIR, exist_ok=True)
+
+    print(f"Starting feature extraction from '{PREPROCESSED_DIR}'...")
+    print(f"Attempting to use SOLC version via solc-select for Slither API: {SOLC_VERSION_FOR_SLITHER_API}")
+
+    if SOLC_BINARY:
+        print(f"  Using solc binary: {SOLC_BINARY}")
+    else:
+        print(f"  solc {SOLC_VERSION_FOR_SLITHER_API} not found in solc-select artifacts; Slither will select it via solc-select.")
+
+    total = ExtractionStats()
 
-        except Exception as e_write:
-            print(f"  CRITICAL: Failed to write feature file {feature_filepath}: {e_write}")
-            failed_extractions +=1 # Count as an additional failure if writing the output fails
+    existing_sources = _list_sources(PREPROCESSED_DIR)
+
+    # Workers return serialized features; this process writes them while they keep compiling
+    writer = _FeatureWriter()
+    try:
+        with open(METADATA_FILE, 'rb') as f:
+            # Each file is compiled and parsed independently, so files are spread across
+            # processes; workers start on the first entries while the rest are still being read
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = [
+                    executor.submit(
+                        _process_one, contract_filename_key, meta_info,
+                        _source_exists(meta_info.get("processed_filepath"), existing_sources), pretty
+                    )
+                    for contract_filename_key, meta_info in _iter_metadata(f)
+                ]
+                for future in as_completed(futures):
+                    _, stats, (feature_filepath, payload) = future.result()
+                    if payload is not None:
+                        writer.put(feature_filepath, payload)
+                    total.add(stats)
+    except FileNotFoundError:
+        print(f"Error: Metadata file '{os.path.abspath(METADATA_FILE)}' not found. Run preprocessing first.")
+        sys.exit(1)
+    except metadata_errors:
+        print(f"Error: Metadata file '{METADATA_FILE}' is corrupted or not valid JSON.")
+        sys.exit(1)
+    finally:
+        writer.close()
+    total.failed += writer.failed_writes # Count as an additional failure if writing the output fails
 
     print("\n--- Feature Extraction Summary ---")
-    print(f"Files with successfully extracted contract features: {successful_extractions}")
-    print(f"Files processed by Slither but yielded no contract objects (e.g., interface-only, severe compile issues not caught as error): {files_with_no_features}")
-    print(f"Files that caused explicit errors during Slither processing or had missing paths/write errors: {failed_extractions}")
-    total_processed_or_attempted = len(metadata)
+    print(f"Files with successfully extracted contract features: {total.ok}")
+    print(f"Files processed by Slither but yielded no contract objects (e.g., interface-only, severe compile issues not caught as error): {total.empty}")
+    print(f"Files that caused explicit errors during Slither processing or had missing paths/write errors: {total.failed}")
+    total_processed_or_attempted = len(futures)
     print(f"Total files from metadata attempted: {total_processed_or_attempted}")
     print(f"Feature files (or error/info reports) saved in '{FEATURES_DIR}'")
 
-def extract_external_features(contract_path=None):
+def extract_external_features(contract_path=None, pretty=False):
     """Extract features from an external contract for evaluation"""
     os.makedirs(EXTERNAL_FEATURES_DIR, exist_ok=True)
     
@@ -224,8 +418,13 @@ def extract_external_features(contract_path=None):
         # Process a specific external contract
         contracts = [contract_path]
     else:
-        # Process all contracts in the external directory
-        contracts = glob(os.path.join(EXTERNAL_DIR, '*.sol'))
+        # Process all contracts in the external directory; scandir gives the file type
+        # from the directory listing, so no per-entry stat is needed
+        try:
+            with os.scandir(EXTERNAL_DIR) as entries:
+                contracts = [e.path for e in entries if e.name.endswith('.sol') and e.is_file()]
+        except FileNotFoundError:
+            contracts = []
     
     if not contracts:
         print(f"No external contracts found in {EXTERNAL_DIR}/")
@@ -233,115 +432,72 @@ def extract_external_features(contract_path=None):
     
     print(f"Extracting features from {len(contracts)} external contract(s)...")
     
+    if not _SLITHER_AVAILABLE:
+        print("CRITICAL ERROR: Slither module not found. Please install slither-analyzer.")
+        sys.exit(1)
+    
+    # Each feature file is written in the background while the next contract compiles
+    writer = _FeatureWriter()
     try:
-        from slither import Slither
-        from slither.exceptions import SlitherError
-        
         for contract_file in contracts:
             print(f"Processing external contract: {contract_file}")
             contract_filename = os.path.basename(contract_file)
-            feature_filename = f"{os.path.splitext(contract_filename)[0]}_features.json"
-            feature_filepath = os.path.join(EXTERNAL_FEATURES_DIR, feature_filename)
-            
+            feature_filepath = os.path.join(EXTERNAL_FEATURES_DIR, f"{os.path.splitext(contract_filename)[0]}_features.json")
+        
             try:
                 slither_instance = Slither(
                     contract_file,
-                    solc_solcs_select=SOLC_VERSION_FOR_SLITHER_API,
-                    disable_fail_on_error=True
+                    disable_fail_on_error=True,
+                    **SLITHER_SOLC_ARGS
                 )
-                
+            
                 contract_features = {}
-                
+            
                 if not slither_instance.contracts:
                     print(f"  Warning: No contracts found in {contract_filename}")
                     contract_features = {"info": "No contract objects found by Slither.", "contract_file": contract_filename}
                 else:
                     for contract_obj in slither_instance.contracts:
-                        # Extract features using the same logic as in extract_all_features
-                        declared_modifier_names = {m.name for m in contract_obj.modifiers}
-
-                        functions_and_modifiers_info = []
-                        for func_or_modifier_obj in contract_obj.functions_and_modifiers:
-                            is_declared_modifier = False
-                            if hasattr(func_or_modifier_obj, 'is_modifier') and func_or_modifier_obj.is_modifier:
-                                is_declared_modifier = True
-                            elif func_or_modifier_obj.name in declared_modifier_names:
-                                is_declared_modifier = True
-
-                            applied_modifiers_names = [m.name for m in func_or_modifier_obj.modifiers]
-
-                            functions_and_modifiers_info.append({
-                                "name": func_or_modifier_obj.full_name,
-                                "signature": func_or_modifier_obj.signature_str,
-                                "visibility": func_or_modifier_obj.visibility,
-                                "is_constructor": func_or_modifier_obj.is_constructor,
-                                "is_declared_modifier": is_declared_modifier,
-                                "applied_modifiers": applied_modifiers_names,
-                                "is_payable": func_or_modifier_obj.payable,
-                                "is_view": func_or_modifier_obj.view,
-                                "is_pure": func_or_modifier_obj.pure,
-                                "parameters": [f"{str(v.type)} {v.name}" for v in func_or_modifier_obj.parameters],
-                                "return_values": [f"{str(v.type)} {v.name if v.name else ''}" for v in func_or_modifier_obj.return_values],
-                            })
-
-                        state_vars_info = []
-                        for var_obj in contract_obj.state_variables:
-                            state_vars_info.append({
-                                "name": var_obj.name,
-                                "type": str(var_obj.type),
-                                "visibility": var_obj.visibility,
-                                "is_constant": var_obj.is_constant,
-                                "is_immutable": var_obj.is_immutable,
-                            })
-
-                        contract_features[contract_obj.name] = {
-                            "contract_name_in_file": contract_obj.name,
-                            "kind": contract_obj.contract_kind,
-                            "inheritance": [c.name for c in contract_obj.inheritance],
-                            "is_fully_implemented": contract_obj.is_fully_implemented,
-                            "defined_functions_and_modifiers": functions_and_modifiers_info,
-                            "defined_state_variables": state_vars_info,
-                        }
-                
-                with open(feature_filepath, 'w', encoding='utf-8') as f_feat:
-                    json.dump(contract_features, f_feat, indent=4)
+                        contract_features[contract_obj.name] = _serialize_contract(contract_obj)
+            
+                writer.put(feature_filepath, _dumps(contract_features, pretty))
                 print(f"  Extracted features saved to {feature_filepath}")
-                
+            
             except SlitherError as se:
                 print(f"  SlitherError while processing {contract_filename}: {se}")
                 contract_features = {"error": f"SlitherError: {str(se)}", "contract_file": contract_filename}
-                with open(feature_filepath, 'w', encoding='utf-8') as f_feat:
-                    json.dump(contract_features, f_feat, indent=4)
+                writer.put(feature_filepath, _dumps(contract_features, pretty))
             except Exception as e:
                 print(f"  Error while processing {contract_filename}: {e}")
                 contract_features = {"error": f"Error: {str(e)}", "contract_file": contract_filename}
-                with open(feature_filepath, 'w', encoding='utf-8') as f_feat:
-                    json.dump(contract_features, f_feat, indent=4)
-                    
-    except ImportError:
-        print("CRITICAL ERROR: Slither module not found. Please install slither-analyzer.")
-        sys.exit(1)
+                writer.put(feature_filepath, _dumps(contract_features, pretty))
+    finally:
+        writer.close()
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
     parser = argparse.ArgumentParser(description='Extract features from smart contracts')
     parser.add_argument('--external', action='store_true', help='Extract features from external contracts')
     parser.add_argument('--contract', type=str, help='Path to a specific external contract')
+    parser.add_argument('--pretty', action='store_true', help='Write indented feature JSON (for debugging)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Basic check for slither module availability before starting
-    try:
-        import slither
-        print("Slither module found.")
-        
-        if args.external:
-            extract_external_features()
-        elif args.contract:
-            extract_external_features(args.contract)
-        else:
-            print("Starting feature extraction for training data...")
-            extract_all_features()
-    except ImportError:
+    if not _SLITHER_AVAILABLE:
         print("CRITICAL ERROR: Slither module not found. Please install slither-analyzer.")
         print("Run: pip install slither-analyzer")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    print("Slither module found.")
+    
+    if args.external:
+        extract_external_features(pretty=args.pretty)
+    elif args.contract:
+        extract_external_features(args.contract, pretty=args.pretty)
+    else:
+        print("Starting feature extraction for training data...")
+        extract_all_features(pretty=args.pretty)
+
+
+if __name__ == "__main__":
+    main()
@@ -373,11 +373,12 @@ def generate_external_report(contract_path):
         return False
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
     parser = argparse.ArgumentParser(description='Generate reports from detection results')
     parser.add_argument('--contract', type=str, help='Path to a specific external contract')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.contract:
         # For external contract evaluation
@@ -385,4 +386,8 @@ if __name__ == "__main__":
         generate_external_report(args.contract)
     else:
         # Default to training report
-        generate_training_report()
\ No newline at end of file
+        generate_training_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -345,12 +345,13 @@ def detect_external_loopholes(contract_path=None):
                 print(f"  Detection complete. Found {len(slither_findings)} Slither issues, {len(custom_findings)} custom rule issues, and {len(model_findings)} model-based issues.")
                 print(f"  Results saved to {result_filepath}")
 
-if __name__ == "__main__":
+def main(argv=None):
+    """Command-line entry point; argv defaults to sys.argv[1:]."""
     parser = argparse.ArgumentParser(description='Detect loopholes in smart contracts')
     parser.add_argument('--external', action='store_true', help='Detect loopholes in external contracts')
     parser.add_argument('--contract', type=str, help='Path to a specific external contract')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Check for Slither before starting
     try:
@@ -371,4 +372,8 @@ if __name__ == "__main__":
     except subprocess.CalledProcessError:
         print("CRITICAL: The 'slither' command is available but returned an error when checking its version.")
         print("This could indicate a problem with the Slither installation.")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
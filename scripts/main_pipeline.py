@@ -3,8 +3,9 @@
 Run the smart contract loophole detection pipeline.
 Supports both training mode for initial data and evaluation mode for external contracts.
 """
-import subprocess
+import asyncio
 import argparse
+import importlib
 import os
 import sys
 
@@ -49,7 +50,7 @@ def setup_directories():
     print("Directory setup complete.")
 
 
-def run_pipeline_step(step_command_list, step_description=""):
+async def run_pipeline_step_async(step_command_list, step_description=""):
     """
     Runs a single pipeline step (a script with arguments).
     step_command_list: A list, e.g., ['python_executable', 'script.py', '--arg1', 'value1']
@@ -65,14 +66,16 @@ def run_pipeline_step(step_command_list, step_description=""):
     print(f"Executing command: {' '.join(step_command_list)}")
 
     try:
-        process = subprocess.Popen(
-            step_command_list,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=PROJECT_ROOT,  # Run script from the project root
-            text=True # Decodes stdout/stderr as text
+        process = await asyncio.create_subprocess_exec(
+            *step_command_list,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=PROJECT_ROOT  # Run script from the project root
         )
-        stdout, stderr = process.communicate()
+        # Both pipes are drained on the event loop, so other steps keep running meanwhile
+        stdout_bytes, stderr_bytes = await process.communicate()
+        stdout = stdout_bytes.decode(errors='replace')
+        stderr = stderr_bytes.decode(errors='replace')
 
         if stdout:
             print(f"--- STDOUT ---\n{stdout}")
@@ -93,6 +96,17 @@ def run_pipeline_step(step_command_list, step_description=""):
         print(f"ERROR: An unexpected error occurred while running step '{step_description}': {e}")
         return False
 
+async def run_pipeline_stage_async(step_command_lists, step_descriptions):
+    """
+    Runs the steps of one pipeline stage side by side; they must not depend on each other.
+    Returns True only if every step succeeded.
+    """
+    results = await asyncio.gather(*[
+        run_pipeline_step_async(command, description)
+        for command, description in zip(step_command_lists, step_descriptions)
+    ])
+    return all(results)
+
 # --- Pipeline Modes ---
 
 def run_default_pipeline(visualize=False, use_ml_model=False):
@@ -112,44 +126,41 @@ def run_default_pipeline(visualize=False, use_ml_model=False):
     else:
         print(f"\nFound contracts in '{smart_contracts_dir_path}'. Proceeding with default pipeline...")
 
-    # Define steps for the default pipeline
+    # Define stages for the default pipeline; the steps within a stage run concurrently
     # Each step script needs to be adapted to know it's running in "default" mode
     # (i.e., using default input/output directories like Preprocessed_Contracts, etc.)
-    default_steps_config = [
-        {'script': 'data_preprocessing.py', 'args': []},
-        {'script': 'feature_extraction.py', 'args': []},
-        {'script': 'loophole_detection.py', 'args': []},
-        {'script': 'generate_report.py', 'args': []},
+    default_stages_config = [
+        [{'script': 'data_preprocessing.py', 'args': []}],
+        # Both only read the preprocessed contracts and metadata, so neither waits for the other
+        [
+            {'script': 'feature_extraction.py', 'args': []},
+            {'script': 'loophole_detection.py', 'args': []},
+        ],
+        [{'script': 'generate_report.py', 'args': []}],
     ]
 
     if use_ml_model: # If you have a train_model.py and want to include it
-        default_steps_config.append({'script': 'train_model.py', 'args': []}) # Assuming it exists
+        default_stages_config.append([{'script': 'train_model.py', 'args': []}]) # Assuming it exists
         # Potentially add a predict_with_model.py step after loophole_detection
 
     if visualize:
-        default_steps_config.append({'script': 'visualization_dashboard.py', 'args': []})
-
-    for step_config in default_steps_config:
-        command = [PYTHON_EXECUTABLE, os.path.join(PROJECT_ROOT, step_config['script'])] + step_config['args']
-        if not run_pipeline_step(command, step_description=step_config['script']):
-            print(f"\nDefault pipeline aborted due to error in {step_config['script']}.")
+        default_stages_config.append([{'script': 'visualization_dashboard.py', 'args': []}])
+
+    for stage_config in default_stages_config:
+        commands = [
+            [PYTHON_EXECUTABLE, os.path.join(PROJECT_ROOT, step_config['script'])] + step_config['args']
+            for step_config in stage_config
+        ]
+        scripts = [step_config['script'] for step_config in stage_config]
+        if not asyncio.run(run_pipeline_stage_async(commands, scripts)):
+            print(f"\nDefault pipeline aborted due to error in {', '.join(scripts)}.")
             sys.exit(1)
 
     print(f"\n{'#'*20} DEFAULT PIPELINE COMPLETED SUCCESSFULLY {'#'*20}")
 
 
-def run_evaluation_pipeline(external_contract_path):
-    """Run the evaluation pipeline on a single external contract."""
-    print(f"\n{'#'*20} STARTING EVALUATION PIPELINE FOR: {external_contract_path} {'#'*20}")
-
-    if not os.path.isfile(external_contract_path): # Ensure it's a file
-        print(f"Error: External contract path is not a file: {external_contract_path}")
-        sys.exit(1)
-
-    # Base name for output files, derived from the input contract name
-    contract_basename = os.path.basename(external_contract_path)
-    contract_name_no_ext = os.path.splitext(contract_basename)[0]
-
+def evaluation_steps(external_contract_path):
+    """Steps of the evaluation pipeline for one external contract."""
     # The existing scripts use these directory structures:
     # - External_Contracts/ (for preprocessed external contracts)
     # - External_Results/features/ (for extracted features)
@@ -161,7 +172,7 @@ def run_evaluation_pipeline(external_contract_path):
     # Individual scripts (data_preprocessing, feature_extraction, etc.)
     # will need to be modified to accept --input_file, --output_dir arguments for evaluation mode.
 
-        # Use the existing command-line interface of the scripts
+    # Use the existing command-line interface of the scripts
     evaluation_steps_config = [
         {
             'script': 'data_preprocessing.py',
@@ -192,17 +203,94 @@ def run_evaluation_pipeline(external_contract_path):
     #     #     print("Failed to train/find model. Evaluation pipeline for ML prediction cannot proceed.")
     #     #     sys.exit(1)
 
+    return evaluation_steps_config
 
-    for step_config in evaluation_steps_config:
-        command = [PYTHON_EXECUTABLE, os.path.join(PROJECT_ROOT, step_config['script'])] + step_config['args']
-        if not run_pipeline_step(command, step_description=f"{step_config['script']} (evaluate)"):
-            print(f"\nEvaluation pipeline aborted due to error in {step_config['script']}.")
-            sys.exit(1)
+
+def run_evaluation_stages(external_contract_path):
+    """
+    Run every evaluation step for one contract inside this interpreter, so the interpreter
+    starts and the step modules are imported once per contract rather than once per step.
+    Returns True only if every step succeeded.
+    """
+    for step_config in evaluation_steps(external_contract_path):
+        step_description = f"{step_config['script']} (evaluate)"
+        print(f"\n{'='*10} RUNNING STEP: {step_description} {'='*10}")
+        try:
+            step_module = importlib.import_module(os.path.splitext(step_config['script'])[0])
+            step_module.main(step_config['args'])
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f"ERROR: Step '{step_description}' failed with exit code {e.code}")
+                return False
+        except Exception as e:
+            print(f"ERROR: An unexpected error occurred while running step '{step_description}': {e}")
+            return False
+        print(f"SUCCESS: Step '{step_description}' completed.")
+    return True
+
+
+async def run_evaluation_pipeline_async(external_contract_path):
+    """Run the evaluation pipeline on a single external contract; returns True on success."""
+    print(f"\n{'#'*20} STARTING EVALUATION PIPELINE FOR: {external_contract_path} {'#'*20}")
+
+    if not os.path.isfile(external_contract_path): # Ensure it's a file
+        print(f"Error: External contract path is not a file: {external_contract_path}")
+        return False
+
+    # Base name for output files, derived from the input contract name
+    contract_basename = os.path.basename(external_contract_path)
+    contract_name_no_ext = os.path.splitext(contract_basename)[0]
+
+    # One interpreter runs every step for this contract (see run_evaluation_stages)
+    command = [PYTHON_EXECUTABLE, os.path.abspath(__file__), '--evaluate-stages', external_contract_path]
+    if not await run_pipeline_step_async(command, step_description=f"evaluation steps for {contract_basename}"):
+        print(f"\nEvaluation pipeline for {contract_basename} aborted due to an error in one of its steps.")
+        return False
 
     # Use the path structure from the existing scripts
     final_report_path = os.path.join(PROJECT_ROOT, "External_Results", "reports", f"{contract_name_no_ext}_report.md")
     print(f"\n{'#'*20} EVALUATION PIPELINE COMPLETED SUCCESSFULLY {'#'*20}")
     print(f"Evaluation report for '{contract_basename}' available at: {final_report_path}")
+    return True
+
+
+def unique_contract_paths(contract_paths):
+    """
+    Drop repeated paths and exit if two contracts share a name; every step
+    names its outputs after the contract, so such runs would overwrite each other.
+    """
+    by_real_path = {}
+    for path in contract_paths:
+        by_real_path.setdefault(os.path.realpath(path), path)
+    unique = list(by_real_path.values())
+    seen = {}
+    for path in unique:
+        contract_name = os.path.splitext(os.path.basename(path))[0]
+        if contract_name in seen:
+            print(f"Error: {seen[contract_name]} and {path} would write the same output files; evaluate them separately.")
+            sys.exit(1)
+        seen[contract_name] = path
+    return unique
+
+
+async def run_evaluation_batch(external_contract_paths):
+    """
+    Run the evaluation pipeline for several external contracts concurrently.
+    Each contract's outputs are named after it, so the paths must have
+    distinct names (see unique_contract_paths).
+    Returns True only if every evaluation succeeded.
+    """
+    results = await asyncio.gather(*[
+        run_evaluation_pipeline_async(contract_path) for contract_path in external_contract_paths
+    ])
+    return all(results)
+
+
+def run_evaluation_pipeline(external_contract_paths):
+    """Run the evaluation pipeline on one or more external contracts, exiting with an error if any fails."""
+    external_contract_paths = unique_contract_paths(external_contract_paths)
+    if not asyncio.run(run_evaluation_batch(external_contract_paths)):
+        sys.exit(1)
 
 
 # --- Main Execution ---
@@ -216,7 +304,8 @@ def main():
     parser.add_argument(
         '--evaluate', 
         type=str,
-        help="Path to a single smart contract file to evaluate"
+        nargs='+',
+        help="Path(s) of smart contract files to evaluate; several are evaluated concurrently"
     )
     parser.add_argument(
         '--visualize',
@@ -228,14 +317,19 @@ def main():
         action='store_true',
         help="Include ML model training/prediction steps"
     )
+    # Internal: runs all evaluation steps for one contract in this process (used by --evaluate)
+    parser.add_argument('--evaluate-stages', type=str, help=argparse.SUPPRESS)
 
     args = parser.parse_args()
 
+    if args.evaluate_stages:
+        sys.exit(0 if run_evaluation_stages(args.evaluate_stages) else 1)
+
     # Ensure all directories are ready
     setup_directories()
 
     if args.evaluate:
-        # Evaluate a single external contract
+        # Evaluate the external contract(s)
         run_evaluation_pipeline(args.evaluate)
     elif args.train or not (args.evaluate or args.train):
         # Default to training mode if no mode is specified
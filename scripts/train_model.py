@@ -156,7 +156,8 @@ def get_severity_for_vulnerability(vuln_type):
     # Default to Medium if not found
     return severity_map.get(vuln_type.lower(), 'Medium')
 
-if __name__ == "__main__":
+def main():
+    """Command-line entry point."""
     import sys
     import subprocess
     
@@ -210,4 +211,7 @@ if __name__ == "__main__":
     
     print("\nModel training complete!")
     print(f"Model saved to {os.path.join(MODELS_DIR, 'vulnerability_patterns.json')}")
-    
+
+
+if __name__ == "__main__":
+    main()